@@ -1,13 +1,16 @@
 """Agent module for handling OpenAI API interactions."""
 
 import logging
-from typing import Optional
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
 
 import openai
-from config import OPENAI_API_KEY
-
-# Initialize the OpenAI client
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+import config
+import metrics
+from response_cache import ResponseCache, make_key
 
 # Configure logging
 logging.basicConfig(
@@ -16,7 +19,118 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+MODEL = "gpt-4"
+MAX_CALL_METRICS = 100
+MAX_TOOL_ROUNDS = 4  # Model turns that may request tools before a plain answer is forced
+SYSTEM_PROMPT_FILE = "prompts/system_prompt.txt"
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a concise running summary of a conversation between a user "
+    "and their email and calendar assistant. Keep names, dates, commitments "
+    "and open action items; drop small talk and verbatim email listings."
+)
+
+
+@dataclass
+class CallMetrics:
+    """Timing (seconds) and token usage of a single chat completion call."""
+    model: str
+    streamed: bool
+    time_to_first_token: Optional[float]
+    total_latency: float
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+# Most recent call timings, oldest first
+call_metrics: Deque[CallMetrics] = deque(maxlen=MAX_CALL_METRICS)
+
+# Cached system prompt with the file mtime it was read at
+_system_prompt: Optional[Tuple[float, str]] = None
+
+# OpenAI clients, created on first use so importing needs no API key
+_client: Optional[openai.OpenAI] = None
+_async_client: Optional[openai.AsyncOpenAI] = None
+
+# Opt-in cache of complete responses keyed by model, messages and params
+response_cache: Optional[ResponseCache] = (
+    ResponseCache(max_entries=config.RESPONSE_CACHE_MAX_ENTRIES, ttl=config.RESPONSE_CACHE_TTL)
+    if config.RESPONSE_CACHE_ENABLED else None
+)
+
+
+def get_client() -> openai.OpenAI:
+    """Return the shared OpenAI client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = openai.OpenAI(api_key=config.OPENAI_API_KEY)
+    return _client
+
+
+def get_async_client() -> openai.AsyncOpenAI:
+    """Return the shared AsyncOpenAI client, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        _async_client = openai.AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+    return _async_client
+
+
+def load_system_prompt() -> str:
+    """Return the system prompt, re-reading the file only when it changes."""
+    global _system_prompt
+    mtime = os.path.getmtime(SYSTEM_PROMPT_FILE)
+    if _system_prompt is None or _system_prompt[0] != mtime:
+        with open(SYSTEM_PROMPT_FILE) as f:
+            _system_prompt = (mtime, f.read())
+    return _system_prompt[1]
+
+
+def _record_call(
+    streamed: bool,
+    started: float,
+    first_token: Optional[float],
+    usage=None
+) -> None:
+    total = time.perf_counter() - started
+    ttft = first_token - started if first_token is not None else None
+    prompt_tokens = getattr(usage, 'prompt_tokens', None)
+    completion_tokens = getattr(usage, 'completion_tokens', None)
+    call_metrics.append(
+        CallMetrics(MODEL, streamed, ttft, total, prompt_tokens, completion_tokens)
+    )
+    metrics.observe('openai.chat', total, model=MODEL, streamed=streamed)
+    if ttft is not None and streamed:
+        metrics.observe('openai.first_token', ttft, model=MODEL)
+    if usage is not None:
+        metrics.inc('openai.prompt_tokens', prompt_tokens or 0, model=MODEL)
+        metrics.inc('openai.completion_tokens', completion_tokens or 0, model=MODEL)
+    logging.info(
+        "Chat completion: streamed=%s ttft=%s total=%.3fs",
+        streamed, f"{ttft:.3f}s" if ttft is not None else "n/a", total
+    )
+
+
+def _build_messages(user_input: str, memory_context: Optional[str]) -> List[Dict]:
+    return [
+        {"role": "system", "content": load_system_prompt()},
+        {"role": "user", "content": f"{memory_context}\n{user_input}"}
+    ]
+
+
+def _check_cache(messages: List[Dict], **params) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return (cache key, cached response); both None when caching is off.
+    
+    The key covers the model, every message sent (system prompt, memory
+    context and input) and the request parameters such as tools.
+    """
+    if not response_cache:
+        return None, None
+    cache_key = make_key(MODEL, messages, **params)
+    return cache_key, response_cache.get(cache_key)
+
 
+@metrics.timed('agent.run_agent')
 def run_agent(user_input: str, memory_context: Optional[str] = None) -> str:
     """
     Process user input through the OpenAI API.
@@ -24,26 +138,306 @@ def run_agent(user_input: str, memory_context: Optional[str] = None) -> str:
     Args:
         user_input: User's query or command
         memory_context: Previous conversation context
-        
+    
     Returns:
         str: Agent's response
     """
+    started = time.perf_counter()
     try:
-        system_prompt = open("prompts/system_prompt.txt").read()
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"{memory_context}\n{user_input}"}
-        ]
+        messages = _build_messages(user_input, memory_context)
+        cache_key, cached = _check_cache(messages)
+        if cached is not None:
+            return cached
+
+        response = get_client().chat.completions.create(
+            model=MODEL,
+            messages=messages
+        )
+        _record_call(False, started, time.perf_counter(), response.usage)
+        content = response.choices[0].message.content
+        if cache_key:
+            response_cache.put(cache_key, content)
+        return content
+
+    except openai.APIError as e:
+        logging.error("API Error: %s", str(e))
+        return f"Error: {str(e)}"
+    except Exception as e:
+        logging.error("Unexpected Error: %s", str(e))
+        return f"Error: {str(e)}"
+
+
+def stream_agent(user_input: str, memory_context: Optional[str] = None) -> Iterator[str]:
+    """
+    Process user input through the OpenAI API, yielding text as it arrives.
+    
+    Args:
+        user_input: User's query or command
+        memory_context: Previous conversation context
+    
+    Yields:
+        str: Response text fragments; on failure a single error message
+    """
+    started = time.perf_counter()
+    first_token = None
+    from_cache = False
+    usage = None
+    try:
+        messages = _build_messages(user_input, memory_context)
+        cache_key, cached = _check_cache(messages)
+        if cached is not None:
+            from_cache = True
+            yield cached
+            return
+
+        stream = get_client().chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        chunks = []
+        for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                if first_token is None:
+                    first_token = time.perf_counter()
+                chunks.append(content)
+                yield content
+        if cache_key:
+            response_cache.put(cache_key, "".join(chunks))
+
+    except openai.APIError as e:
+        logging.error("API Error: %s", str(e))
+        yield f"Error: {str(e)}"
+    except Exception as e:
+        logging.error("Unexpected Error: %s", str(e))
+        yield f"Error: {str(e)}"
+    finally:
+        if not from_cache:
+            _record_call(True, started, first_token, usage)
+
 
-        response = client.chat.completions.create(
-            model="gpt-4",
+@metrics.timed('agent.run_agent')
+async def run_agent_async(user_input: str, memory_context: Optional[str] = None) -> str:
+    """Async counterpart of run_agent using the AsyncOpenAI client."""
+    started = time.perf_counter()
+    try:
+        messages = _build_messages(user_input, memory_context)
+        cache_key, cached = _check_cache(messages)
+        if cached is not None:
+            return cached
+
+        response = await get_async_client().chat.completions.create(
+            model=MODEL,
             messages=messages
         )
-        return response.choices[0].message.content
+        _record_call(False, started, time.perf_counter(), response.usage)
+        content = response.choices[0].message.content
+        if cache_key:
+            response_cache.put(cache_key, content)
+        return content
 
     except openai.APIError as e:
         logging.error("API Error: %s", str(e))
         return f"Error: {str(e)}"
     except Exception as e:
         logging.error("Unexpected Error: %s", str(e))
-        return f"Error: {str(e)}"
\ No newline at end of file
+        return f"Error: {str(e)}"
+
+
+async def stream_agent_async(
+    user_input: str,
+    memory_context: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Async counterpart of stream_agent using the AsyncOpenAI client."""
+    started = time.perf_counter()
+    first_token = None
+    from_cache = False
+    usage = None
+    try:
+        messages = _build_messages(user_input, memory_context)
+        cache_key, cached = _check_cache(messages)
+        if cached is not None:
+            from_cache = True
+            yield cached
+            return
+
+        stream = await get_async_client().chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        chunks = []
+        async for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                if first_token is None:
+                    first_token = time.perf_counter()
+                chunks.append(content)
+                yield content
+        if cache_key:
+            response_cache.put(cache_key, "".join(chunks))
+
+    except openai.APIError as e:
+        logging.error("API Error: %s", str(e))
+        yield f"Error: {str(e)}"
+    except Exception as e:
+        logging.error("Unexpected Error: %s", str(e))
+        yield f"Error: {str(e)}"
+    finally:
+        if not from_cache:
+            _record_call(True, started, first_token, usage)
+
+
+async def stream_agent_with_tools(
+    user_input: str,
+    memory_context: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Stream a response, letting the model call the Gmail and Calendar tools.
+    
+    Each model turn is streamed; when it asks for tools, every call from
+    that turn runs concurrently and the results are sent back in the next
+    turn. After MAX_TOOL_ROUNDS the model must answer without tools.
+    With the response cache enabled, answers that needed no tool call are
+    cached; anything built from live mailbox or calendar data is not.
+    
+    Yields:
+        str: Response text fragments; on failure a single error message
+    """
+    from tools import TOOLS
+
+    messages = _build_messages(user_input, memory_context)
+    with metrics.span('agent.respond'):
+        cache_key, cached = _check_cache(messages, tools=TOOLS, tool_choice="auto")
+        if cached is not None:
+            yield cached
+            return
+        async for text in _run_tool_rounds(messages, cache_key):
+            yield text
+
+
+async def _run_tool_rounds(messages: List[Dict], cache_key: Optional[str]) -> AsyncIterator[str]:
+    from tools import TOOLS, dispatch_tool_calls
+
+    try:
+        for round_number in range(MAX_TOOL_ROUNDS + 1):
+            started = time.perf_counter()
+            first_token = None
+            usage = None
+            tool_calls: Dict[int, Dict] = {}
+            chunks = []
+
+            stream = await get_async_client().chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                tools=TOOLS,
+                tool_choice="auto" if round_number < MAX_TOOL_ROUNDS else "none",
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if first_token is None and (delta.content or delta.tool_calls):
+                    first_token = time.perf_counter()
+                if delta.content:
+                    chunks.append(delta.content)
+                    yield delta.content
+                # Tool call names and arguments arrive in fragments keyed by index
+                for part in delta.tool_calls or []:
+                    call = tool_calls.setdefault(part.index, {
+                        'id': '', 'type': 'function', 'function': {'name': '', 'arguments': ''}
+                    })
+                    if part.id:
+                        call['id'] = part.id
+                    if part.function and part.function.name:
+                        call['function']['name'] += part.function.name
+                    if part.function and part.function.arguments:
+                        call['function']['arguments'] += part.function.arguments
+            _record_call(True, started, first_token, usage)
+
+            if not tool_calls:
+                if cache_key and round_number == 0:
+                    response_cache.put(cache_key, "".join(chunks))
+                return
+            calls = [tool_calls[index] for index in sorted(tool_calls)]
+            messages.append({
+                "role": "assistant",
+                "content": "".join(chunks) or None,
+                "tool_calls": calls
+            })
+            messages.extend(await dispatch_tool_calls(calls))
+
+    except openai.APIError as e:
+        logging.error("API Error: %s", str(e))
+        yield f"Error: {str(e)}"
+    except Exception as e:
+        logging.error("Unexpected Error: %s", str(e))
+        yield f"Error: {str(e)}"
+
+
+def summarize_history(summary: str, transcript: str) -> str:
+    """
+    Fold a transcript into an existing running summary.
+    
+    Args:
+        summary: Current summary, empty if there is none yet
+        transcript: Conversation lines to fold in
+    
+    Returns:
+        str: Updated summary
+    """
+    started = time.perf_counter()
+    response = get_client().chat.completions.create(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+            {
+                "role": "user",
+                "content": (
+                    f"Current summary:\n{summary or '(none)'}\n\n"
+                    f"New conversation:\n{transcript}\n\n"
+                    "Return only the updated summary."
+                )
+            }
+        ]
+    )
+    _record_call(False, started, time.perf_counter(), response.usage)
+    return response.choices[0].message.content.strip()
+
+
+async def complete_async(instructions: str, prompt: str) -> str:
+    """
+    Run a one-off completion outside the conversation (no memory, no cache).
+    
+    Args:
+        instructions: System message for the task
+        prompt: User message
+    
+    Returns:
+        str: Model response text
+    """
+    started = time.perf_counter()
+    response = await get_async_client().chat.completions.create(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": prompt}
+        ]
+    )
+    _record_call(False, started, time.perf_counter(), response.usage)
+    return response.choices[0].message.content or ""
@@ -0,0 +1,182 @@
+"""
+Asyncio adapters over the blocking Gmail, Calendar and memory calls.
+
+Integration modules are imported inside each wrapper so that loading this
+module (and the REPL) does not pull in the Google client stack, pytz or
+numpy before a command needs them.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+# Worker threads for Google API calls; each keeps its own keep-alive transport
+IO_WORKERS = 8
+
+_io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="google-io")
+# A single writer keeps memory appends in submission order
+_memory_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-io")
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking integration call on the I/O worker pool."""
+    loop = asyncio.get_running_loop()
+    # Carry context variables (e.g. the open metrics span) into the worker
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _io_executor, functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+async def list_emails(max_results: int = 10) -> List[Dict]:
+    """Async wrapper for gmail_integration.list_emails."""
+    import gmail_integration
+    return await run_blocking(gmail_integration.list_emails, max_results)
+
+
+async def search_emails(query: str, max_results: int = 5) -> List[Dict]:
+    """Async wrapper for gmail_integration.search_emails."""
+    import gmail_integration
+    return await run_blocking(gmail_integration.search_emails, query, max_results)
+
+
+async def get_message_body(msg_id: str) -> str:
+    """Async wrapper for gmail_integration.get_message_body."""
+    import gmail_integration
+    return await run_blocking(gmail_integration.get_message_body, msg_id)
+
+
+async def send_email(to: str, subject: str, message_text: str) -> dict:
+    """Async wrapper for gmail_integration.send_email."""
+    import gmail_integration
+    return await run_blocking(gmail_integration.send_email, to, subject, message_text)
+
+
+async def mail_merge_send(template_path: str, recipients_path: str) -> Dict:
+    """Async wrapper for mail_merge.mail_merge."""
+    import mail_merge
+    return await run_blocking(mail_merge.mail_merge, template_path, recipients_path)
+
+
+async def list_upcoming_events(max_results: int = 10, days_ahead: int = 7) -> List[Dict]:
+    """Async wrapper for calendar_integration.list_upcoming_events."""
+    import calendar_integration
+    return await run_blocking(
+        calendar_integration.list_upcoming_events, max_results, days_ahead
+    )
+
+
+async def list_events_between(
+    time_min: datetime,
+    time_max: datetime,
+    max_results: int = 10
+) -> List[Dict]:
+    """Async wrapper for calendar_integration.list_events_between."""
+    import calendar_integration
+    return await run_blocking(
+        calendar_integration.list_events_between, time_min, time_max, max_results
+    )
+
+
+async def iter_agenda(time_min: datetime, time_max: datetime) -> AsyncIterator[Dict]:
+    """
+    Async counterpart of calendar_integration.iter_agenda.
+    
+    Each event is awaited on the I/O pool, so events reach the caller
+    as the merge produces them without blocking the event loop.
+    """
+    import calendar_integration
+    agenda = calendar_integration.iter_agenda(time_min, time_max)
+    try:
+        while True:
+            event = await run_blocking(next, agenda, None)
+            if event is None:
+                return
+            yield event
+    finally:
+        await run_blocking(agenda.close)
+
+
+async def list_agenda(days_ahead: int = 7, max_results: int = 25) -> List[Dict]:
+    """Async wrapper for calendar_integration.list_agenda."""
+    import calendar_integration
+    return await run_blocking(calendar_integration.list_agenda, days_ahead, max_results)
+
+
+async def search_events(
+    query: str,
+    max_results: int = 10,
+    time_min: Optional[datetime] = None
+) -> List[Dict]:
+    """Async wrapper for calendar_integration.search_events."""
+    import calendar_integration
+    return await run_blocking(
+        calendar_integration.search_events, query, max_results, time_min
+    )
+
+
+async def add_event(summary: str, start_time: datetime, **kwargs) -> str:
+    """Async wrapper for calendar_integration.add_event."""
+    import calendar_integration
+    return await run_blocking(calendar_integration.add_event, summary, start_time, **kwargs)
+
+
+async def delete_event(event_id: str) -> str:
+    """Async wrapper for calendar_integration.delete_event."""
+    import calendar_integration
+    return await run_blocking(calendar_integration.delete_event, event_id)
+
+
+async def is_free(start_time: datetime, end_time: datetime) -> bool:
+    """Async wrapper for calendar_integration.is_free."""
+    import calendar_integration
+    return await run_blocking(calendar_integration.is_free, start_time, end_time)
+
+
+async def find_free_time(
+    range_start: datetime,
+    range_end: datetime,
+    duration_minutes: int = 60
+) -> List[Tuple[datetime, datetime]]:
+    """Async wrapper for calendar_integration.find_free_time."""
+    import calendar_integration
+    return await run_blocking(
+        calendar_integration.find_free_time, range_start, range_end, duration_minutes
+    )
+
+
+async def import_events(path: str) -> Dict:
+    """Async wrapper for calendar_import.import_events."""
+    import calendar_import
+    return await run_blocking(calendar_import.import_events, path)
+
+
+async def briefing(max_emails: int = 5, max_events: int = 5) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Fetch the inbox and the agenda concurrently.
+    
+    Returns:
+        Tuple[List[Dict], List[Dict]]: Recent emails and upcoming events
+    """
+    emails, events = await asyncio.gather(
+        list_emails(max_emails),
+        list_upcoming_events(max_events)
+    )
+    return emails, events
+
+
+async def update_memory(user: str, agent: str) -> None:
+    """Persist an exchange on the ordered memory writer."""
+    from memory import memory
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_memory_executor, memory.update_memory, user, agent)
+
+
+async def build_context(user_input: str) -> str:
+    """Assemble conversation context after queued memory writes land."""
+    from memory.context_builder import build_context as _build_context
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_memory_executor, _build_context, user_input)
@@ -0,0 +1,273 @@
+"""
+Offline benchmark of the assistant's hot paths against local fake APIs.
+
+Starts benchmarks/fake_backends.py, points the app at it through
+GOOGLE_API_ROOT_URL and OPENAI_BASE_URL, and runs inside a scratch
+directory with a fake OAuth token so no real account or key is touched.
+
+Usage:
+    python benchmarks/bench_hot_paths.py [--iterations N] [--concurrency N]
+        [--latency S] [--error-rate F] [--mailbox-size N]
+        [--calendar-size N] [--memory-records N] [--scenario NAME ...]
+        [--output results.json]
+
+Prints one JSON document with p50/p95/p99 latency (ms) and throughput
+(ops/s) per scenario so runs can be diffed.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fake_backends import FakeBackendConfig, FakeBackendServer  # noqa: E402
+
+SCENARIOS = [
+    'list_emails',
+    'list_upcoming_events',
+    'process_user_input',
+    'memory_write',
+    'memory_read',
+    'search_memory',
+]
+
+# Inputs cycled through by the process_user_input scenario
+USER_INPUTS = [
+    "list emails",
+    "list events",
+    "am I free tomorrow at 3pm?",
+    "What should I focus on this afternoon?",
+]
+
+FAKE_TOKEN = {
+    'token': 'fake-access-token',
+    'refresh_token': 'fake-refresh-token',
+    'client_id': 'fake-client-id',
+    'client_secret': 'fake-client-secret',
+    'expiry': '2099-01-01T00:00:00Z',
+}
+
+
+def summarize(samples: List[float], wall: float) -> Dict:
+    """Latency percentiles in milliseconds plus throughput."""
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        'count': len(samples),
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'throughput_per_s': round(len(samples) / wall, 2) if wall else None,
+    }
+
+
+def run_threaded(func: Callable[[int], object], iterations: int, concurrency: int) -> Dict:
+    """Time func(i) for each iteration across a pool of threads."""
+    def timed(i: int) -> float:
+        started = time.perf_counter()
+        func(i)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(timed, range(iterations)))
+    return summarize(samples, time.perf_counter() - started)
+
+
+def prepare_sandbox(server_url: str) -> str:
+    """Create a scratch working directory and environment for the app."""
+    sandbox = tempfile.mkdtemp(prefix="agent-bench-")
+    shutil.copytree(os.path.join(REPO_ROOT, "prompts"), os.path.join(sandbox, "prompts"))
+    with open(os.path.join(sandbox, "token.json"), "w") as f:
+        json.dump(FAKE_TOKEN, f)
+    os.environ.update({
+        'OPENAI_API_KEY': 'fake-key',
+        'OPENAI_BASE_URL': f"{server_url}/v1",
+        'GOOGLE_API_ROOT_URL': server_url,
+        # Sync on every call so the incremental path is what gets measured
+        'CALENDAR_MAX_STALENESS': '0',
+        'RESPONSE_CACHE_ENABLED': '',
+    })
+    os.chdir(sandbox)
+    return sandbox
+
+
+def bench_process_user_input(iterations: int, concurrency: int) -> Dict:
+    """Drive the REPL dispatcher, including memory writes, on one event loop."""
+    import main
+
+    async def run() -> Dict:
+        semaphore = asyncio.Semaphore(concurrency)
+        samples: List[float] = []
+
+        async def one(i: int) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                await main.process_user_input(USER_INPUTS[i % len(USER_INPUTS)], "")
+                samples.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await asyncio.gather(*(one(i) for i in range(iterations)))
+            await main.flush_memory()
+        return summarize(samples, time.perf_counter() - started)
+
+    return asyncio.run(run())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.005,
+                        help="seconds of fake server latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--mailbox-size", type=int, default=1000)
+    parser.add_argument("--new-mail", type=int, default=1,
+                        help="messages arriving per Gmail history call")
+    parser.add_argument("--calendar-size", type=int, default=500)
+    parser.add_argument("--completion-tokens", type=int, default=50)
+    parser.add_argument("--tool-call", action="append", default=[],
+                        help="tool the fake model calls on its first turn (repeatable)")
+    parser.add_argument("--memory-records", type=int, default=5000,
+                        help="exchanges stored before the memory scenarios")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS)
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    config = FakeBackendConfig(
+        latency=args.latency,
+        jitter=args.latency / 2,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        mailbox_size=args.mailbox_size,
+        new_mail_per_history=args.new_mail,
+        calendar_size=args.calendar_size,
+        completion_tokens=args.completion_tokens,
+        tool_calls=args.tool_call,
+    )
+    output = os.path.abspath(args.output) if args.output else None
+    scenarios = args.scenario or SCENARIOS
+
+    with FakeBackendServer(config) as server:
+        sandbox = prepare_sandbox(server.url)
+        try:
+            # Imported after the environment is prepared; config is lazy
+            import calendar_integration
+            import gmail_integration
+            from memory import memory
+            from memory.context_builder import build_context
+
+            results: Dict[str, Dict] = {}
+            timed_cold: Dict[str, float] = {}
+
+            def cold(name: str, func: Callable[[], object]) -> None:
+                started = time.perf_counter()
+                func()
+                timed_cold[name] = round((time.perf_counter() - started) * 1000, 3)
+
+            def seed_memory() -> None:
+                for n in range(args.memory_records):
+                    memory.update_memory(
+                        f"question {n} about project {n % 17}",
+                        f"answer {n} mentioning meeting {n % 23}"
+                    )
+
+            # Scenario name -> (untimed warm-up or None, timed runner)
+            runners = {
+                'list_emails': (
+                    lambda: gmail_integration.list_emails(10),
+                    lambda: run_threaded(lambda i: gmail_integration.list_emails(10),
+                                         args.iterations, args.concurrency)
+                ),
+                'list_upcoming_events': (
+                    lambda: calendar_integration.list_upcoming_events(10),
+                    lambda: run_threaded(lambda i: calendar_integration.list_upcoming_events(10),
+                                         args.iterations, args.concurrency)
+                ),
+                'process_user_input': (
+                    None,
+                    lambda: bench_process_user_input(args.iterations, args.concurrency)
+                ),
+                # Writes are serialized in the app, so measure them on one thread
+                'memory_write': (
+                    None,
+                    lambda: run_threaded(
+                        lambda i: memory.update_memory(f"bench question {i}", f"bench answer {i}"),
+                        args.iterations, 1
+                    )
+                ),
+                'memory_read': (
+                    None,
+                    lambda: run_threaded(
+                        lambda i: (memory.retrieve_context(), build_context(f"project {i % 17}")),
+                        args.iterations, 1
+                    )
+                ),
+                'search_memory': (
+                    None,
+                    lambda: run_threaded(lambda i: memory.search_memory(f"project {i % 17}"),
+                                         args.iterations, args.concurrency)
+                ),
+            }
+
+            if {'memory_write', 'memory_read', 'search_memory'} & set(scenarios):
+                cold('memory_seed', seed_memory)
+            for name in SCENARIOS:
+                if name not in scenarios:
+                    continue
+                warm_up, runner = runners[name]
+                try:
+                    if warm_up:
+                        cold(name, warm_up)
+                    results[name] = runner()
+                except Exception as e:
+                    # Keep the rest of the report; the exit status flags it
+                    results[name] = {'error': f"{type(e).__name__}: {e}"}
+
+            report = {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'parameters': vars(args),
+                'cold_start_ms': timed_cold,
+                'scenarios': results,
+                'fake_server_requests': server.requests,
+            }
+        finally:
+            os.chdir(REPO_ROOT)
+            shutil.rmtree(sandbox, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    failed = [name for name, result in report['scenarios'].items() if 'error' in result]
+    if failed:
+        print(f"Failed scenarios: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Startup benchmark: time from launching the REPL to its first prompt.
+
+Runs `python main.py` repeatedly with piped stdin, measures how long it
+takes for the "You: " prompt to appear, then closes stdin so the REPL
+exits. Also reports which heavy modules importing main pulls in.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N] [--target SECONDS]
+
+Exits with status 1 when the median time-to-prompt exceeds the target.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPT = b"You: "
+
+# Median time-to-prompt budget in seconds
+TARGET_SECONDS = 0.5
+
+# Modules that should only load once a command needs them
+HEAVY_MODULES = [
+    'openai',
+    'googleapiclient',
+    'google_auth_oauthlib',
+    'pytz',
+    'numpy',
+    'tiktoken',
+]
+
+
+def time_to_prompt() -> float:
+    """Launch the REPL once and return seconds until the prompt is shown."""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=REPO_ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    output = b""
+    try:
+        while PROMPT not in output:
+            chunk = proc.stdout.read1(4096)
+            if not chunk:
+                raise RuntimeError("REPL exited before showing a prompt")
+            output += chunk
+        return time.perf_counter() - started
+    finally:
+        proc.stdin.close()
+        proc.wait(timeout=30)
+
+
+def eager_modules() -> list:
+    """Return the heavy modules that are loaded by importing main."""
+    probe = (
+        "import json, sys, main; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target", type=float, default=TARGET_SECONDS)
+    args = parser.parse_args()
+
+    time_to_prompt()  # Warm the OS file cache and __pycache__
+    samples = [time_to_prompt() for _ in range(args.runs)]
+    median = statistics.median(samples)
+    report = {
+        'runs': args.runs,
+        'median_seconds': round(median, 4),
+        'min_seconds': round(min(samples), 4),
+        'max_seconds': round(max(samples), 4),
+        'target_seconds': args.target,
+        'within_target': median <= args.target,
+        'eager_heavy_modules': eager_modules(),
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report['within_target'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,473 @@
+"""
+Local stand-ins for the OpenAI, Gmail and Calendar HTTP APIs.
+
+A single threaded HTTP server answers the endpoints the assistant uses:
+
+    POST /v1/chat/completions                         (JSON or SSE stream)
+    GET  /gmail/v1/users/me/profile
+    GET  /gmail/v1/users/me/messages[/<id>]
+    POST /gmail/v1/users/me/messages/send
+    GET  /gmail/v1/users/me/history
+    GET  /calendar/v3/calendars/<id>/events           (pageToken/syncToken or timeMin/timeMax)
+    POST /calendar/v3/calendars/<id>/events
+    DEL  /calendar/v3/calendars/<id>/events/<id>
+    GET  /calendar/v3/users/me/calendarList
+    POST /calendar/v3/freeBusy
+    POST /batch, /batch/calendar/v3                   (multipart/mixed)
+
+Point the app at it with GOOGLE_API_ROOT_URL=<url> and
+OPENAI_BASE_URL=<url>/v1.
+"""
+
+import base64
+import email
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+@dataclass
+class FakeBackendConfig:
+    """Knobs for the fake services."""
+    latency: float = 0.005           # Seconds added to every HTTP request
+    jitter: float = 0.002            # Uniform extra latency, seconds
+    error_rate: float = 0.0          # Fraction of API calls that fail
+    error_status: int = 503          # Status returned for injected failures
+    mailbox_size: int = 1000         # Inbox messages
+    new_mail_per_history: int = 0    # Messages arriving per history.list call
+    calendar_size: int = 500         # Primary calendar events
+    other_calendars: int = 2         # Extra calendars for free/busy
+    completion_tokens: int = 50      # Words in each chat completion
+    token_latency: float = 0.0       # Seconds between streamed tokens
+    # Argument-free tools the model "requests" on its first turn when
+    # the request offers tools, e.g. ['list_emails', 'list_upcoming_events']
+    tool_calls: List[str] = field(default_factory=list)
+
+
+def _json(status: int, body) -> Response:
+    return status, {'Content-Type': 'application/json'}, json.dumps(body).encode()
+
+
+def _error(status: int) -> Response:
+    reason = 'rateLimitExceeded' if status in (403, 429) else 'backendError'
+    return _json(status, {'error': {
+        'code': status,
+        'message': 'Injected failure',
+        'errors': [{'reason': reason, 'message': 'Injected failure'}]
+    }})
+
+
+class FakeState:
+    """Mailbox and calendar contents shared by all request threads."""
+
+    def __init__(self, config: FakeBackendConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.messages: Dict[str, Dict] = {}
+        self.inbox: List[str] = []        # Newest first
+        self.history_id = 1000
+        self.sent = 0
+        for _ in range(config.mailbox_size):
+            self._add_message(deliver_at_front=False)
+
+        self.events: Dict[str, Dict] = {}
+        self.changes: List[str] = []      # Event IDs in modification order
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        for n in range(config.calendar_size):
+            begin = start + timedelta(hours=n * 7 % (30 * 24))
+            self._put_event({
+                'id': f"evt{n}",
+                'status': 'confirmed',
+                'summary': f"Meeting {n}",
+                'location': f"Room {n % 10}",
+                'start': {'dateTime': begin.isoformat()},
+                'end': {'dateTime': (begin + timedelta(hours=1)).isoformat()},
+            })
+
+    def _add_message(self, deliver_at_front: bool = True) -> str:
+        n = len(self.messages)
+        msg_id = f"{n:016x}"
+        sent_at = datetime.now(timezone.utc)
+        if not deliver_at_front:
+            sent_at -= timedelta(minutes=n)
+        body = f"Hello, this is message {n} about project {n % 17}.".encode()
+        self.messages[msg_id] = {
+            'id': msg_id,
+            'threadId': msg_id,
+            'labelIds': ['INBOX', 'UNREAD'],
+            'snippet': body.decode()[:100],
+            'historyId': str(self.history_id),
+            'internalDate': str(int(sent_at.timestamp() * 1000)),
+            'payload': {
+                'mimeType': 'text/plain',
+                'headers': [
+                    {'name': 'From', 'value': f"sender{n % 50}@example.com"},
+                    {'name': 'To', 'value': 'me@example.com'},
+                    {'name': 'Subject', 'value': f"Update {n}"},
+                    {'name': 'Date', 'value': sent_at.strftime('%a, %d %b %Y %H:%M:%S +0000')},
+                ],
+                'body': {'size': len(body), 'data': base64.urlsafe_b64encode(body).decode()},
+            },
+        }
+        if deliver_at_front:
+            self.inbox.insert(0, msg_id)
+        else:
+            self.inbox.append(msg_id)
+        return msg_id
+
+    def _put_event(self, event: Dict) -> None:
+        self.events[event['id']] = event
+        self.changes.append(event['id'])
+
+    # Gmail
+
+    def gmail(self, method: str, parts: List[str], query: Dict, body: bytes) -> Response:
+        # parts: ['users', 'me', ...]
+        resource = parts[2:]
+        with self.lock:
+            if resource == ['profile']:
+                return _json(200, {'emailAddress': 'me@example.com',
+                                   'historyId': str(self.history_id),
+                                   'messagesTotal': len(self.messages)})
+            if resource == ['messages'] and method == 'GET':
+                return self._list_messages(query)
+            if resource == ['messages', 'send'] and method == 'POST':
+                self.sent += 1
+                return _json(200, {'id': f"sent{self.sent}", 'labelIds': ['SENT']})
+            if len(resource) == 2 and resource[0] == 'messages' and method == 'GET':
+                message = self.messages.get(resource[1])
+                if message is None:
+                    return _json(404, {'error': {'code': 404, 'message': 'Not Found'}})
+                message_format = query.get('format', ['full'])[0]
+                if message_format == 'metadata':
+                    wanted = {name.lower() for name in query.get('metadataHeaders', [])}
+                    headers = [h for h in message['payload']['headers']
+                               if not wanted or h['name'].lower() in wanted]
+                    message = {**message, 'payload': {'headers': headers}}
+                return _json(200, message)
+            if resource == ['history']:
+                return self._history(query)
+        return _json(404, {'error': {'code': 404, 'message': 'Unknown Gmail path'}})
+
+    def _list_messages(self, query: Dict) -> Response:
+        ids = self.inbox
+        if 'q' in query:
+            terms = query['q'][0].lower().split()
+            ids = [
+                i for i in ids
+                if all(t in self.messages[i]['snippet'].lower() for t in terms)
+            ]
+        offset = int(query.get('pageToken', ['0'])[0] or 0)
+        size = int(query.get('maxResults', ['100'])[0])
+        page = ids[offset:offset + size]
+        result = {
+            'messages': [{'id': i, 'threadId': i} for i in page],
+            'resultSizeEstimate': len(ids),
+        }
+        if offset + size < len(ids):
+            result['nextPageToken'] = str(offset + size)
+        return _json(200, result)
+
+    def _history(self, query: Dict) -> Response:
+        start = int(query['startHistoryId'][0])
+        if start < 1000:
+            return _json(404, {'error': {'code': 404, 'message': 'History expired'}})
+        records = []
+        for _ in range(self.config.new_mail_per_history):
+            self.history_id += 1
+            msg_id = self._add_message()
+            records.append({'id': str(self.history_id),
+                            'messagesAdded': [{'message': {'id': msg_id}}]})
+        return _json(200, {'history': records, 'historyId': str(self.history_id)})
+
+    # Calendar
+
+    def calendar(self, method: str, parts: List[str], query: Dict, body: bytes) -> Response:
+        with self.lock:
+            if parts == ['users', 'me', 'calendarList']:
+                items = [{'id': 'primary-id', 'summary': 'Me', 'primary': True,
+                          'accessRole': 'owner'}] + [
+                    {'id': f"other{n}@example.com", 'summary': f"Team {n}",
+                     'accessRole': 'reader'}
+                    for n in range(self.config.other_calendars)
+                ]
+                return _json(200, {'items': items})
+            if parts == ['freeBusy'] and method == 'POST':
+                request = json.loads(body)
+                return _json(200, {'calendars': {
+                    item['id']: {'busy': []} for item in request.get('items', [])
+                }})
+            if len(parts) >= 3 and parts[0] == 'calendars' and parts[2] == 'events':
+                if len(parts) == 3 and method == 'GET':
+                    return self._list_events(query, unquote(parts[1]))
+                if len(parts) == 3 and method == 'POST':
+                    event = json.loads(body)
+                    if event.get('id') in self.events:
+                        return _json(409, {'error': {'code': 409, 'message': 'Duplicate'}})
+                    event.setdefault('id', f"new{len(self.changes)}")
+                    event.update(status='confirmed', htmlLink=f"https://calendar/{event['id']}")
+                    self._put_event(event)
+                    return _json(200, event)
+                if len(parts) == 4 and method == 'DELETE':
+                    event = self.events.get(parts[3])
+                    if event is None:
+                        return _json(404, {'error': {'code': 404, 'message': 'Not Found'}})
+                    self._put_event({**event, 'status': 'cancelled'})
+                    return 204, {}, b""
+        return _json(404, {'error': {'code': 404, 'message': 'Unknown Calendar path'}})
+
+    def _other_calendar_events(self, calendar_id: str) -> List[Dict]:
+        # Every third primary event, shifted by half an hour per calendar
+        shift = timedelta(minutes=30 * (1 + int(re.sub(r"\D", "", calendar_id) or 0)))
+        events = []
+        for event in list(self.events.values())[::3]:
+            if event.get('status') == 'cancelled' or 'dateTime' not in event['start']:
+                continue
+            start = datetime.fromisoformat(event['start']['dateTime']) + shift
+            events.append({
+                **event,
+                'id': f"{event['id']}x{calendar_id[:6]}",
+                'start': {'dateTime': start.isoformat()},
+                'end': {'dateTime': (start + timedelta(hours=1)).isoformat()},
+            })
+        return events
+
+    def _list_events(self, query: Dict, calendar_id: str = 'primary') -> Response:
+        if calendar_id not in ('primary', 'primary-id'):
+            # Windowed, start-ordered reads as the agenda makes them
+            events = self._other_calendar_events(calendar_id)
+            if 'timeMin' in query:
+                low = datetime.fromisoformat(query['timeMin'][0].replace('Z', '+00:00'))
+                events = [e for e in events if datetime.fromisoformat(e['end']['dateTime']) > low]
+            if 'timeMax' in query:
+                high = datetime.fromisoformat(query['timeMax'][0].replace('Z', '+00:00'))
+                events = [e for e in events if datetime.fromisoformat(e['start']['dateTime']) < high]
+            events.sort(key=lambda e: datetime.fromisoformat(e['start']['dateTime']))
+            offset = int(query.get('pageToken', ['0'])[0] or 0)
+            size = int(query.get('maxResults', ['250'])[0])
+            result = {'items': events[offset:offset + size]}
+            if offset + size < len(events):
+                result['nextPageToken'] = str(offset + size)
+            return _json(200, result)
+
+        if 'syncToken' in query:
+            since = int(query['syncToken'][0])
+            if since > len(self.changes):
+                return _json(410, {'error': {'code': 410, 'message': 'Gone'}})
+            changed = dict.fromkeys(self.changes[since:])
+            items = [self.events[i] for i in changed]
+            return _json(200, {'items': items, 'nextSyncToken': str(len(self.changes))})
+
+        live = [e for e in self.events.values() if e.get('status') != 'cancelled']
+        offset = int(query.get('pageToken', ['0'])[0] or 0)
+        size = int(query.get('maxResults', ['250'])[0])
+        result = {'items': live[offset:offset + size]}
+        if offset + size < len(live):
+            result['nextPageToken'] = str(offset + size)
+        else:
+            result['nextSyncToken'] = str(len(self.changes))
+        return _json(200, result)
+
+    # OpenAI
+
+    def completion_text(self) -> str:
+        return " ".join(f"word{n}" for n in range(self.config.completion_tokens))
+
+
+class FakeBackendServer:
+    """Threaded HTTP server hosting all fake APIs on one port."""
+
+    def __init__(self, config: Optional[FakeBackendConfig] = None, port: int = 0):
+        self.config = config or FakeBackendConfig()
+        self.state = FakeState(self.config)
+        self.requests = 0
+        self._count_lock = threading.Lock()
+        handler = type('Handler', (_Handler,), {'backend': self})
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeBackendServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeBackendServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def dispatch(self, method: str, target: str, body: bytes) -> Response:
+        """Answer one (non-batch) Google API request."""
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            return _error(self.config.error_status)
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = [p for p in url.path.split('/') if p]
+        if parts[:2] == ['gmail', 'v1']:
+            return self.state.gmail(method, parts[2:], query, body)
+        if parts[:2] == ['calendar', 'v3']:
+            return self.state.calendar(method, parts[2:], query, body)
+        return _json(404, {'error': {'code': 404, 'message': 'Unknown API'}})
+
+    def dispatch_batch(self, content_type: str, body: bytes) -> Response:
+        """Answer a multipart/mixed batch by dispatching each embedded request."""
+        envelope = email.message_from_bytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body
+        )
+        boundary = "batch_fake_boundary"
+        out = []
+        for part in envelope.get_payload():
+            raw = part.get_payload(decode=False)
+            head, _, sub_body = raw.replace("\r\n", "\n").partition("\n\n")
+            request_line = head.split("\n", 1)[0]
+            method, target, _ = request_line.split(" ", 2)
+            status, headers, content = self.dispatch(method, target, sub_body.encode())
+            content_id = part['Content-ID'].strip('<>')
+            header_lines = "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+            out.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} Fake\r\n{header_lines}\r\n".encode()
+                + content + b"\r\n"
+            )
+        payload = b"".join(out) + f"--{boundary}--\r\n".encode()
+        return 200, {'Content-Type': f"multipart/mixed; boundary={boundary}"}, payload
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    backend: FakeBackendServer
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _delay(self) -> None:
+        config = self.backend.config
+        time.sleep(config.latency + random.uniform(0, config.jitter))
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, response: Response) -> None:
+        status, headers, content = response
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _handle(self) -> None:
+        body = self._body()
+        with self.backend._count_lock:
+            self.backend.requests += 1
+        self._delay()
+        if self.path.startswith('/v1/chat/completions'):
+            self._chat(json.loads(body or b"{}"))
+        elif self.path.startswith('/batch'):
+            self._send(self.backend.dispatch_batch(self.headers['Content-Type'], body))
+        else:
+            self._send(self.backend.dispatch(self.command, self.path, body))
+
+    do_GET = do_POST = do_DELETE = do_PUT = do_PATCH = _handle
+
+    def _start_stream(self) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+    def _event(self, model: str, choices: List[Dict], **extra) -> None:
+        chunk = {'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk',
+                 'created': int(time.time()), 'model': model, 'choices': choices, **extra}
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.flush()
+
+    def _tool_calls(self, request: Dict, model: str, calls: List[Dict], usage: Dict) -> None:
+        if not request.get('stream'):
+            self._send(_json(200, {
+                'id': 'chatcmpl-fake', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': model, 'usage': usage,
+                'choices': [{'index': 0, 'finish_reason': 'tool_calls',
+                             'message': {'role': 'assistant', 'content': None,
+                                         'tool_calls': calls}}],
+            }))
+            return
+        self._start_stream()
+        for index, call in enumerate(calls):
+            self._event(model, [{'index': 0, 'finish_reason': None, 'delta': {
+                'tool_calls': [{**call, 'index': index}]
+            }}])
+        self._event(model, [{'index': 0, 'finish_reason': 'tool_calls', 'delta': {}}])
+        if request.get('stream_options', {}).get('include_usage'):
+            self._event(model, [], usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _chat(self, request: Dict) -> None:
+        config = self.backend.config
+        if config.error_rate and random.random() < config.error_rate:
+            self._send(_json(config.error_status, {'error': {
+                'message': 'Injected failure', 'type': 'server_error'
+            }}))
+            return
+
+        model = request.get('model', 'fake')
+        text = self.backend.state.completion_text()
+        usage = {'prompt_tokens': sum(len(str(m.get('content', '')).split())
+                                      for m in request.get('messages', [])),
+                 'completion_tokens': config.completion_tokens}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        offered = {tool['function']['name'] for tool in request.get('tools', [])}
+        calls = [
+            {'id': f"call_{n}", 'type': 'function',
+             'function': {'name': name, 'arguments': '{}'}}
+            for n, name in enumerate(config.tool_calls) if name in offered
+        ]
+        answered = any(m.get('role') == 'tool' for m in request.get('messages', []))
+        if calls and not answered and request.get('tool_choice') != 'none':
+            self._tool_calls(request, model, calls, usage)
+            return
+        if not request.get('stream'):
+            self._send(_json(200, {
+                'id': 'chatcmpl-fake', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': model, 'usage': usage,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': text}}],
+            }))
+            return
+
+        self._start_stream()
+        for n, word in enumerate(text.split(" ")):
+            if config.token_latency:
+                time.sleep(config.token_latency)
+            self._event(model, [{'index': 0, 'finish_reason': None,
+                                 'delta': {'content': word if n == 0 else " " + word}}])
+        self._event(model, [{'index': 0, 'finish_reason': 'stop', 'delta': {}}])
+        if request.get('stream_options', {}).get('include_usage'):
+            self._event(model, [], usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
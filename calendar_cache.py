@@ -0,0 +1,185 @@
+"""Local on-disk cache of Google Calendar events."""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Define constants
+CACHE_FILE = "cache/calendar.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    search_text TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, id)
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (calendar_id, start_ts);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _search_text(event: Dict) -> str:
+    return " ".join(
+        event.get(field) or "" for field in ('summary', 'description', 'location')
+    ).lower()
+
+
+class CalendarCache:
+    """SQLite store for calendar events and their sync tokens."""
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Bumped whenever event rows change so derived indexes know to rebuild
+        self.version = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get_state(self, key: str) -> Optional[str]:
+        """Return a sync state value such as a calendar's sync token."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM sync_state WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: str) -> None:
+        """Persist a sync state value."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                (key, str(value))
+            )
+
+    def clear_state(self, key: str) -> None:
+        """Forget a sync state value."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM sync_state WHERE key = ?", (key,))
+
+    def store(self, calendar_id: str, events: Iterable[Tuple[Dict, float, float]]) -> None:
+        """
+        Insert or replace events.
+        
+        Args:
+            calendar_id: Calendar the events belong to
+            events: (event resource, start epoch, end epoch) tuples
+        """
+        with self._lock, self._connect() as conn:
+            if self._store(conn, calendar_id, events):
+                self.version += 1
+
+    def replace_all(self, calendar_id: str, events: Iterable[Tuple[Dict, float, float]]) -> None:
+        """Atomically swap a calendar's events for a freshly synced set."""
+        with self._lock, self._connect() as conn:
+            changed = conn.execute(
+                "DELETE FROM events WHERE calendar_id = ?", (calendar_id,)
+            ).rowcount
+            if self._store(conn, calendar_id, events) or changed:
+                self.version += 1
+
+    def _store(self, conn: sqlite3.Connection, calendar_id: str, events) -> int:
+        """Write events and return the number of rows changed."""
+        return conn.executemany(
+            "INSERT OR REPLACE INTO events "
+            "(calendar_id, id, start_ts, end_ts, search_text, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (calendar_id, event['id'], start_ts, end_ts,
+                 _search_text(event), json.dumps(event))
+                for event, start_ts, end_ts in events
+            ]
+        ).rowcount
+
+    def delete(self, calendar_id: str, event_ids: Iterable[str]) -> None:
+        """Remove events from the cache."""
+        with self._lock, self._connect() as conn:
+            if conn.executemany(
+                "DELETE FROM events WHERE calendar_id = ? AND id = ?",
+                [(calendar_id, i) for i in event_ids]
+            ).rowcount > 0:
+                self.version += 1
+
+    def busy_intervals(self, calendar_id: str) -> List[Tuple[float, float, Tuple[str, str]]]:
+        """
+        Return (start, end, (event ID, summary)) for events that block time.
+        
+        Events marked transparent ("show as available") are skipped.
+        """
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT start_ts, end_ts, id, "
+                "coalesce(json_extract(data, '$.summary'), '(No title)') "
+                "FROM events WHERE calendar_id = ? "
+                "AND coalesce(json_extract(data, '$.transparency'), 'opaque') != 'transparent'",
+                (calendar_id,)
+            ).fetchall()
+        return [(start, end, (event_id, summary)) for start, end, event_id, summary in rows]
+
+    def between(
+        self,
+        calendar_id: str,
+        time_min: float,
+        time_max: Optional[float] = None,
+        query: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Return events overlapping [time_min, time_max) ordered by start time.
+        
+        Args:
+            calendar_id: Calendar to read
+            time_min: Only events ending after this epoch time
+            time_max: Only events starting before this epoch time
+            query: Case-insensitive text matched against summary,
+                description and location
+            limit: Maximum number of events
+        
+        Returns:
+            List[Dict]: Event resources
+        """
+        sql = "SELECT data FROM events WHERE calendar_id = ? AND end_ts > ?"
+        params: List = [calendar_id, time_min]
+        if time_max is not None:
+            sql += " AND start_ts < ?"
+            params.append(time_max)
+        if query:
+            sql += " AND instr(search_text, ?) > 0"
+            params.append(query.lower())
+        sql += " ORDER BY start_ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+_cache: Optional[CalendarCache] = None
+
+
+def get_calendar_cache() -> CalendarCache:
+    """Return the process-wide calendar cache."""
+    global _cache
+    if _cache is None:
+        _cache = CalendarCache()
+    return _cache
@@ -0,0 +1,134 @@
+"""Interval index for calendar conflict checks and free-slot search."""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timedelta, tzinfo
+from itertools import accumulate
+from typing import Any, Iterable, List, Optional, Tuple
+
+Interval = Tuple[float, float, Any]
+
+
+def merge_intervals(intervals: Iterable[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Merge overlapping or touching (start, end) pairs into sorted disjoint spans."""
+    merged: List[List[float]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+class IntervalIndex:
+    """
+    Static index over [start, end) intervals in epoch seconds.
+    
+    Intervals are kept sorted by start alongside a running maximum of
+    their ends. Because that maximum never decreases, both "does anything
+    overlap [s, e)?" and "where do intervals ending after s begin?" are
+    answered with a bisect, i.e. in O(log n), and listing overlaps costs
+    O(log n + k) for k results.
+    """
+
+    def __init__(self, intervals: Iterable[Interval]):
+        ordered = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self._intervals = ordered
+        self._starts = [item[0] for item in ordered]
+        self._max_ends = list(accumulate((item[1] for item in ordered), max))
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def _first_ending_after(self, start: float) -> int:
+        """Index of the first interval whose running max end exceeds start."""
+        return bisect_right(self._max_ends, start)
+
+    def is_free(self, start: float, end: float) -> bool:
+        """Return True if nothing overlaps [start, end)."""
+        hi = bisect_left(self._starts, end)
+        return hi == 0 or self._max_ends[hi - 1] <= start
+
+    def overlapping(self, start: float, end: float) -> List[Interval]:
+        """Return intervals overlapping [start, end), ordered by start."""
+        lo = self._first_ending_after(start)
+        hi = bisect_left(self._starts, end)
+        return [item for item in self._intervals[lo:hi] if item[1] > start]
+
+    def busy_between(self, start: float, end: float) -> List[Tuple[float, float]]:
+        """Return merged busy spans clipped to [start, end)."""
+        return [
+            (max(s, start), min(e, end))
+            for s, e in merge_intervals(
+                (item[0], item[1]) for item in self.overlapping(start, end)
+            )
+        ]
+
+
+def find_free_slots(
+    busy: List[Tuple[float, float]],
+    range_start: datetime,
+    range_end: datetime,
+    duration: timedelta,
+    tz: tzinfo,
+    work_start: time = time(9),
+    work_end: time = time(17),
+    weekdays_only: bool = True,
+    limit: Optional[int] = None
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Find free windows of at least duration inside working hours.
+    
+    Args:
+        busy: Merged, sorted busy spans in epoch seconds
+        range_start: Earliest slot start (timezone-aware)
+        range_end: Latest slot end (timezone-aware)
+        duration: Minimum slot length
+        tz: pytz timezone that working hours are expressed in
+        work_start: Start of the working day
+        work_end: End of the working day
+        weekdays_only: Skip Saturdays and Sundays
+        limit: Maximum number of slots to return
+    
+    Returns:
+        List[Tuple[datetime, datetime]]: Free (start, end) windows in tz
+    """
+    slots: List[Tuple[datetime, datetime]] = []
+    busy_ends = [end for _, end in busy]
+    needed = duration.total_seconds()
+    day = range_start.astimezone(tz).date()
+    last_day = range_end.astimezone(tz).date()
+
+    while day <= last_day:
+        if weekdays_only and day.weekday() >= 5:
+            day += timedelta(days=1)
+            continue
+
+        window_start = max(
+            tz.localize(datetime.combine(day, work_start)).timestamp(),
+            range_start.timestamp()
+        )
+        window_end = min(
+            tz.localize(datetime.combine(day, work_end)).timestamp(),
+            range_end.timestamp()
+        )
+
+        cursor = window_start
+        i = bisect_right(busy_ends, cursor)
+        while cursor < window_end:
+            next_busy = busy[i][0] if i < len(busy) else window_end
+            gap_end = min(next_busy, window_end)
+            if gap_end - cursor >= needed:
+                slots.append((
+                    datetime.fromtimestamp(cursor, tz),
+                    datetime.fromtimestamp(gap_end, tz)
+                ))
+                if limit is not None and len(slots) >= limit:
+                    return slots
+            if i >= len(busy):
+                break
+            cursor = max(cursor, busy[i][1])
+            i += 1
+
+        day += timedelta(days=1)
+
+    return slots
@@ -1,17 +1,40 @@
 """Google Calendar integration for managing events and schedules."""
 
-from datetime import datetime, timedelta
-import os.path
-from typing import List, Dict, Optional  # Add Optional to imports
-import pytz
-
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as day_time, timedelta, timezone
+import heapq
+import logging
+import queue
+import threading
+import time
+from typing import Iterator, List, Dict, Optional, Tuple  # Add Optional to imports
+
+from googleapiclient.errors import HttpError
+from calendar_cache import CalendarCache, get_calendar_cache
+from calendar_index import IntervalIndex, find_free_slots, merge_intervals
+from config import CALENDAR_MAX_STALENESS, LOCAL_TIMEZONE
 from google_auth import get_google_credentials
+from service_registry import execute, get_service
+
+PRIMARY_CALENDAR = 'primary'
+WORK_DAY_START = day_time(9)
+WORK_DAY_END = day_time(17)
+MAX_FREEBUSY_CALENDARS = 50  # Free/busy API limit per query
+AGENDA_PAGE_SIZE = 250  # events.list page size when reading agenda windows
+AGENDA_WORKERS = 8  # Calendars fetched at once in agenda mode
+
+# Serializes syncs so concurrent callers don't download the same changes
+_sync_lock = threading.Lock()
 
-LOCAL_TIMEZONE = pytz.timezone('America/New_York')  # Adjust to your timezone
+# Busy-time index over cached events, tagged with the cache version it reflects
+_busy_index: Optional[Tuple[int, IntervalIndex]] = None
+
+# Threads that read non-primary calendars for the agenda
+_agenda_pool: Optional[ThreadPoolExecutor] = None
+_agenda_lock = threading.Lock()
+
+# Marks the end of one calendar's stream in iter_agenda
+_END = object()
 
 def parse_date_time(date_str: str, time_str: Optional[str] = None) -> datetime:
     """
@@ -45,23 +68,19 @@ def format_event_time(event: Dict) -> str:
         return f"All day on {start}"
 
 def get_calendar_service():
-    """Initialize and return Calendar service."""
+    """Return the shared Calendar service."""
     creds = get_google_credentials()
-    return build('calendar', 'v3', credentials=creds)
+    return get_service('calendar', 'v3', creds)
 
-def add_event(
+def build_event_body(
     summary: str,
     start_time: datetime,
-    end_time: Optional[datetime] = None,
+    end_time: datetime,
     description: Optional[str] = None,
     location: Optional[str] = None
-) -> str:
-    """Add a new calendar event."""
-    if not end_time:
-        end_time = start_time + timedelta(hours=1)  # Default 1-hour duration
-    
-    service = get_calendar_service()
-    event = {
+) -> Dict:
+    """Build an events.insert request body for a timed event."""
+    return {
         'summary': summary,
         'location': location,
         'description': description,
@@ -74,62 +93,423 @@ def add_event(
             'timeZone': LOCAL_TIMEZONE.zone
         }
     }
+
+def add_event(
+    summary: str,
+    start_time: datetime,
+    end_time: Optional[datetime] = None,
+    description: Optional[str] = None,
+    location: Optional[str] = None,
+    allow_conflicts: bool = True
+) -> str:
+    """Add a new calendar event, reporting any events it overlaps."""
+    if not end_time:
+        end_time = start_time + timedelta(hours=1)  # Default 1-hour duration
     
+    conflicts = ", ".join(c['summary'] for c in find_conflicts(start_time, end_time))
+    if conflicts and not allow_conflicts:
+        return f"Event not created, it overlaps with: {conflicts}"
+
     try:
-        event = service.events().insert(calendarId='primary', body=event).execute()
-        return f"Event created: {event.get('htmlLink')}"
+        event = insert_event(build_event_body(summary, start_time, end_time, description, location))
+        result = f"Event created: {event.get('htmlLink')}"
+        if conflicts:
+            result += f" (overlaps with: {conflicts})"
+        return result
     except HttpError as error:
         return f"Error creating event: {error}"
 
+def insert_event(body: Dict) -> Dict:
+    """
+    Insert an event into the primary calendar and the local store.
+    
+    Unlike add_event this raises HttpError, so callers can retry; give
+    body an 'id' to make retried inserts fail with 409 instead of
+    creating duplicates.
+    """
+    event = execute(get_calendar_service().events().insert(calendarId='primary', body=body))
+    get_calendar_cache().store(PRIMARY_CALENDAR, [(event, *event_bounds(event))])
+    return event
+
+def remove_event(event_id: str) -> None:
+    """Delete a primary-calendar event, raising HttpError on failure."""
+    execute(get_calendar_service().events().delete(calendarId='primary', eventId=event_id))
+    get_calendar_cache().delete(PRIMARY_CALENDAR, [event_id])
+
 def delete_event(event_id: str) -> str:
     """Delete a calendar event by ID."""
-    service = get_calendar_service()
     try:
-        service.events().delete(calendarId='primary', eventId=event_id).execute()
+        remove_event(event_id)
         return "Event deleted successfully"
     except HttpError as error:
         return f"Error deleting event: {error}"
 
-def list_upcoming_events(max_results: int = 10, days_ahead: int = 7) -> List[Dict]:
-    """List upcoming calendar events."""
-    service = get_calendar_service()
-    now = datetime.utcnow()
-    time_max = (now + timedelta(days=days_ahead)).isoformat() + 'Z'
+def _to_timestamp(value: str) -> float:
+    """Convert an RFC 3339 dateTime or an all-day date to epoch seconds."""
+    if 'T' in value:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    return LOCAL_TIMEZONE.localize(datetime.strptime(value, '%Y-%m-%d')).timestamp()
+
+def _utc_timestamp(dt: datetime) -> float:
+    """Epoch seconds for dt, treating naive datetimes as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def event_bounds(event: Dict) -> Tuple[float, float]:
+    """Return an event's (start, end) as epoch seconds."""
+    start = event['start'].get('dateTime', event['start'].get('date'))
+    end = event['end'].get('dateTime', event['end'].get('date'))
+    return _to_timestamp(start), _to_timestamp(end)
+
+def _sync_pages(
+    service,
+    cache: CalendarCache,
+    calendar_id: str,
+    sync_token: Optional[str]
+) -> None:
+    """Download a full or incremental change set and apply it to the cache."""
+    changed = []
+    page_token = None
+    while True:
+        params = {
+            'calendarId': calendar_id,
+            'singleEvents': True,
+            'maxResults': 2500,
+            'pageToken': page_token
+        }
+        if sync_token:
+            params['syncToken'] = sync_token
+        response = execute(service.events().list(**params))
+        changed.extend(response.get('items', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+
+    live = [
+        (event, *event_bounds(event))
+        for event in changed if event.get('status') != 'cancelled'
+    ]
+    if sync_token:
+        cache.store(calendar_id, live)
+        cache.delete(
+            calendar_id,
+            [event['id'] for event in changed if event.get('status') == 'cancelled']
+        )
+    else:
+        cache.replace_all(calendar_id, live)
+    cache.set_state(f'sync_token:{calendar_id}', response['nextSyncToken'])
+
+def sync_calendar(
+    service,
+    cache: Optional[CalendarCache] = None,
+    calendar_id: str = PRIMARY_CALENDAR
+) -> None:
+    """
+    Bring the local event store up to date.
     
+    The first sync downloads every event; later syncs send the stored
+    syncToken and only receive changes. A 410 Gone (expired token)
+    falls back to a full resync.
+    """
+    cache = cache or get_calendar_cache()
+    sync_token = cache.get_state(f'sync_token:{calendar_id}')
     try:
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=now.isoformat() + 'Z',
-            timeMax=time_max,
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        return events_result.get('items', [])
+        _sync_pages(service, cache, calendar_id, sync_token)
     except HttpError as error:
-        logging.error("Error fetching events: %s", error)
-        return []
+        if error.resp.status != 410 or not sync_token:
+            raise
+        logging.warning("Calendar sync token expired, running full resync")
+        cache.clear_state(f'sync_token:{calendar_id}')
+        _sync_pages(service, cache, calendar_id, None)
+    cache.set_state(f'synced_at:{calendar_id}', time.time())
+
+def refresh_calendar(
+    max_staleness: float = CALENDAR_MAX_STALENESS,
+    calendar_id: str = PRIMARY_CALENDAR
+) -> CalendarCache:
+    """Return the event store, syncing first if it is older than max_staleness."""
+    cache = get_calendar_cache()
+    with _sync_lock:
+        synced_at = float(cache.get_state(f'synced_at:{calendar_id}') or 0)
+        if time.time() - synced_at > max_staleness:
+            try:
+                sync_calendar(get_calendar_service(), cache, calendar_id)
+            except HttpError as error:
+                # Serve whatever the cache already holds
+                logging.error("Error syncing calendar: %s", error)
+    return cache
+
+def list_upcoming_events(max_results: int = 10, days_ahead: int = 7) -> List[Dict]:
+    """List upcoming calendar events from the local event store."""
+    cache = refresh_calendar()
+    now = time.time()
+    return cache.between(
+        PRIMARY_CALENDAR,
+        now,
+        now + timedelta(days=days_ahead).total_seconds(),
+        limit=max_results
+    )
+
+def list_events_between(
+    time_min: datetime,
+    time_max: datetime,
+    max_results: int = 10
+) -> List[Dict]:
+    """List cached events overlapping [time_min, time_max)."""
+    cache = refresh_calendar()
+    return cache.between(
+        PRIMARY_CALENDAR,
+        _utc_timestamp(time_min),
+        _utc_timestamp(time_max),
+        limit=max_results
+    )
 
 def search_events(
     query: str,
     max_results: int = 10,
     time_min: Optional[datetime] = None
 ) -> List[Dict]:
-    """Search for calendar events."""
-    service = get_calendar_service()
-    if not time_min:
-        time_min = datetime.utcnow()
+    """Search for calendar events in the local event store."""
+    cache = refresh_calendar()
+    start = _utc_timestamp(time_min) if time_min else time.time()
+    return cache.between(PRIMARY_CALENDAR, start, query=query, limit=max_results)
+
+
+def get_busy_index() -> IntervalIndex:
+    """Return the busy-time index over cached events, rebuilt after changes."""
+    global _busy_index
+    cache = refresh_calendar()
+    version = cache.version
+    if _busy_index is None or _busy_index[0] != version:
+        _busy_index = (version, IntervalIndex(cache.busy_intervals(PRIMARY_CALENDAR)))
+    return _busy_index[1]
+
+def find_conflicts(start_time: datetime, end_time: datetime) -> List[Dict]:
+    """Return cached primary-calendar events overlapping the given time."""
+    return [
+        {'id': event_id, 'summary': summary}
+        for _, _, (event_id, summary) in get_busy_index().overlapping(
+            start_time.timestamp(), end_time.timestamp()
+        )
+    ]
+
+def query_freebusy(
+    time_min: datetime,
+    time_max: datetime,
+    calendar_ids: Optional[List[str]] = None
+) -> List[Tuple[float, float]]:
+    """
+    Return busy spans from the free/busy API.
     
+    Args:
+        time_min: Start of the range
+        time_max: End of the range
+        calendar_ids: Calendars to query; defaults to every calendar in
+            the user's list except the (locally cached) primary one
+        
+    Returns:
+        List[Tuple[float, float]]: Busy (start, end) spans in epoch seconds
+    """
+    service = get_calendar_service()
     try:
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=time_min.isoformat() + 'Z',
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy='startTime',
-            q=query
-        ).execute()
-        return events_result.get('items', [])
+        if calendar_ids is None:
+            calendars = execute(service.calendarList().list(minAccessRole='freeBusyReader'))
+            calendar_ids = [
+                c['id'] for c in calendars.get('items', []) if not c.get('primary')
+            ]
+        calendar_ids = calendar_ids[:MAX_FREEBUSY_CALENDARS]
+        if not calendar_ids:
+            return []
+
+        response = execute(service.freebusy().query(body={
+            'timeMin': time_min.isoformat(),
+            'timeMax': time_max.isoformat(),
+            'items': [{'id': calendar_id} for calendar_id in calendar_ids]
+        }))
     except HttpError as error:
-        logging.error("Error searching events: %s", error)
-        return []
\ No newline at end of file
+        logging.error("Error querying free/busy: %s", error)
+        return []
+
+    return [
+        (_to_timestamp(busy['start']), _to_timestamp(busy['end']))
+        for calendar in response.get('calendars', {}).values()
+        for busy in calendar.get('busy', [])
+    ]
+
+def is_free(
+    start_time: datetime,
+    end_time: datetime,
+    include_other_calendars: bool = True
+) -> bool:
+    """Check whether the given time is free."""
+    if not get_busy_index().is_free(start_time.timestamp(), end_time.timestamp()):
+        return False
+    if include_other_calendars:
+        return not query_freebusy(start_time, end_time)
+    return True
+
+def find_free_time(
+    range_start: datetime,
+    range_end: datetime,
+    duration_minutes: int = 60,
+    include_other_calendars: bool = True,
+    limit: Optional[int] = 5
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Find free slots within working hours.
+    
+    Args:
+        range_start: Earliest slot start (timezone-aware)
+        range_end: Latest slot end (timezone-aware)
+        duration_minutes: Minimum slot length
+        include_other_calendars: Also honour free/busy of other calendars
+        limit: Maximum number of slots
+        
+    Returns:
+        List[Tuple[datetime, datetime]]: Free (start, end) windows
+    """
+    busy = get_busy_index().busy_between(range_start.timestamp(), range_end.timestamp())
+    if include_other_calendars:
+        busy = merge_intervals(busy + query_freebusy(range_start, range_end))
+    return find_free_slots(
+        busy,
+        range_start,
+        range_end,
+        timedelta(minutes=duration_minutes),
+        LOCAL_TIMEZONE,
+        work_start=WORK_DAY_START,
+        work_end=WORK_DAY_END,
+        limit=limit
+    )
+
+def list_calendars(min_access_role: str = 'reader') -> List[Dict]:
+    """
+    Return the user's calendars from calendarList, following every page.
+    
+    Args:
+        min_access_role: Least access needed; 'reader' can list events
+    
+    Returns:
+        List[Dict]: calendarList entries (id, summary, primary, ...)
+    """
+    service = get_calendar_service()
+    calendars: List[Dict] = []
+    page_token = None
+    while True:
+        response = execute(service.calendarList().list(
+            minAccessRole=min_access_role,
+            pageToken=page_token
+        ))
+        calendars.extend(response.get('items', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return calendars
+
+def _get_agenda_pool() -> ThreadPoolExecutor:
+    global _agenda_pool
+    with _agenda_lock:
+        if _agenda_pool is None:
+            _agenda_pool = ThreadPoolExecutor(
+                max_workers=AGENDA_WORKERS, thread_name_prefix="calendar-agenda"
+            )
+        return _agenda_pool
+
+def _read_window(
+    calendar: Dict,
+    time_min: datetime,
+    time_max: datetime,
+    out: "queue.Queue",
+    stop: threading.Event
+) -> None:
+    """Feed one calendar's events in [time_min, time_max) to out, in start order."""
+    try:
+        if calendar.get('primary'):
+            # The primary calendar is served from the synced local store
+            events = refresh_calendar().between(
+                PRIMARY_CALENDAR, _utc_timestamp(time_min), _utc_timestamp(time_max)
+            )
+            for event in events:
+                out.put((event_bounds(event)[0], event))
+            return
+
+        service = get_calendar_service()
+        page_token = None
+        while not stop.is_set():
+            response = execute(service.events().list(
+                calendarId=calendar['id'],
+                timeMin=time_min.isoformat(),
+                timeMax=time_max.isoformat(),
+                singleEvents=True,
+                orderBy='startTime',
+                maxResults=AGENDA_PAGE_SIZE,
+                pageToken=page_token
+            ))
+            for event in response.get('items', []):
+                if event.get('status') != 'cancelled':
+                    out.put((event_bounds(event)[0], event))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+    except Exception as e:
+        # One unreadable calendar should not hide the others
+        logging.error("Error reading calendar %s: %s", calendar.get('id'), e)
+    finally:
+        out.put(_END)
+
+def _drain(out: "queue.Queue", calendar: Dict) -> Iterator[Tuple[float, Dict]]:
+    name = calendar.get('summaryOverride') or calendar.get('summary') or calendar['id']
+    while True:
+        item = out.get()
+        if item is _END:
+            return
+        start, event = item
+        yield start, {**event, 'calendar_id': calendar['id'], 'calendar': name}
+
+def iter_agenda(
+    time_min: datetime,
+    time_max: datetime,
+    calendars: Optional[List[Dict]] = None
+) -> Iterator[Dict]:
+    """
+    Yield events from every calendar in start-time order.
+    
+    Each calendar's window is read on its own thread (already sorted by
+    start), and the streams are combined with a heap-based k-way merge.
+    An event is yielded as soon as every calendar still being read has
+    delivered something later, so output starts after each calendar's
+    first page rather than after the slowest calendar finishes.
+    Closing the generator early stops further page requests.
+    
+    Args:
+        time_min: Window start (timezone-aware)
+        time_max: Window end (timezone-aware)
+        calendars: calendarList entries; defaults to list_calendars()
+    
+    Returns:
+        Iterator[Dict]: Events with 'calendar_id' and 'calendar' (display
+        name) added
+    """
+    if calendars is None:
+        calendars = list_calendars()
+    stop = threading.Event()
+    pool = _get_agenda_pool()
+    streams = []
+    for calendar in calendars:
+        out: "queue.Queue" = queue.Queue()
+        pool.submit(_read_window, calendar, time_min, time_max, out, stop)
+        streams.append(_drain(out, calendar))
+    try:
+        for _, event in heapq.merge(*streams, key=lambda item: item[0]):
+            yield event
+    finally:
+        stop.set()
+
+def list_agenda(days_ahead: int = 7, max_results: int = 25) -> List[Dict]:
+    """List upcoming events across all calendars, merged by start time."""
+    now = datetime.now(LOCAL_TIMEZONE)
+    agenda = iter_agenda(now, now + timedelta(days=days_ahead))
+    try:
+        return [event for _, event in zip(range(max_results), agenda)]
+    finally:
+        agenda.close()
@@ -1,12 +1,41 @@
 """Configuration module for managing environment variables and API keys."""
 
 import os
-from typing import Optional
-from dotenv import load_dotenv
+from typing import Any, Callable, Dict, Tuple
+
+_loaded = False
+
+# Settings resolved on first attribute access: name -> (default, parser)
+_SETTINGS: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    # Maximum prompt tokens spent on conversation context per request
+    "CONTEXT_TOKEN_BUDGET": ("1500", int),
+    # Opt-in cache of chat completion responses
+    "RESPONSE_CACHE_ENABLED": ("", lambda value: value.lower() in ("1", "true", "yes")),
+    "RESPONSE_CACHE_TTL": ("86400", float),
+    "RESPONSE_CACHE_MAX_ENTRIES": ("500", int),
+    # Seconds the local calendar cache may be served before it is re-synced
+    "CALENDAR_MAX_STALENESS": ("60", float),
+    # Alternative root URL for Google APIs, e.g. a local fake for benchmarks
+    "GOOGLE_API_ROOT_URL": ("", str),
+    # IANA name of the user's timezone, for event times and relative dates
+    "LOCAL_TIMEZONE": ("America/New_York", lambda value: _timezone(value)),
+}
+
+
+def _timezone(name: str):
+    # pytz is only needed once a setting that uses it is read
+    import pytz
+    return pytz.timezone(name)
+
 
 def load_config() -> None:
-    """Load environment variables from .env file."""
-    load_dotenv()
+    """Load environment variables from .env file (once per process)."""
+    global _loaded
+    if not _loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _loaded = True
+
 
 def get_api_key() -> str:
     """
@@ -14,10 +43,11 @@ def get_api_key() -> str:
     
     Returns:
         str: The API key value
-        
+    
     Raises:
         ValueError: If the API key is not set in environment variables
     """
+    load_config()
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError(
@@ -26,8 +56,21 @@ def get_api_key() -> str:
         )
     return api_key
 
-# Load environment variables on module import
-load_config()
 
-# Export the API key for use in other modules
-OPENAI_API_KEY = get_api_key()
+def __getattr__(name: str) -> Any:
+    """
+    Resolve settings on first access instead of at import.
+    
+    Commands that never reach OpenAI therefore work without a key, and
+    importing this module does not read .env.
+    """
+    if name == "OPENAI_API_KEY":
+        value = get_api_key()
+    elif name in _SETTINGS:
+        load_config()
+        default, parse = _SETTINGS[name]
+        value = parse(os.getenv(name, default))
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
@@ -1,51 +1,56 @@
 """Gmail integration module for handling email operations."""
 
 import base64
-import os.path
+import html
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.message import Message
 from email.mime.text import MIMEText
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
 import logging
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from google_auth import get_google_credentials
+from mail_cache import MailboxCache, get_body_cache, get_mailbox_cache
+from rate_limiter import is_rate_limited
+from service_registry import execute, execute_batch, get_service
 
-# Define scopes for Gmail API access
-SCOPES = [
-    'https://www.googleapis.com/auth/gmail.send',
-    'https://www.googleapis.com/auth/gmail.readonly'
-]
+# Sub-requests sent per batch HTTP call (Gmail allows at most 100)
+BATCH_SIZE = 50
+MAX_BATCH_SIZE = 100
+
+# Number of inbox messages pulled into the local cache on a full sync
+FULL_SYNC_SIZE = 100
+
+# Metadata requests return only these headers and fields, which is all
+# extract_message_details reads
+METADATA_HEADERS = ['From', 'Subject', 'Date']
+METADATA_FIELDS = 'id,threadId,labelIds,snippet,internalDate,payload/headers'
+
+# MIME nesting levels returned for body requests; text parts sit at most
+# a few levels down (mixed > related > alternative > plain)
+BODY_PART_DEPTH = 4
+# Longest body text returned (and cached) per message
+MAX_BODY_CHARS = 50_000
+
+# messages.list page size for MessagePager (Gmail allows up to 500)
+PAGE_SIZE = 100
+
+# Background threads that fetch the next page while one is consumed
+_prefetch_pool: Optional[ThreadPoolExecutor] = None
+_prefetch_lock = threading.Lock()
 
 
 def get_gmail_service():
     """
-    Initialize and return the Gmail service object.
+    Return the shared Gmail service object.
     
     Returns:
         Resource: Gmail API service object
     """
-    creds = None
-    if os.path.exists('token_gmail.json'):
-        creds = Credentials.from_authorized_user_file('token_gmail.json', SCOPES)
-
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json',
-                SCOPES
-            )
-            creds = flow.run_local_server(port=0)
-
-        # Save the credentials for future runs
-        with open('token_gmail.json', 'w') as token:
-            token.write(creds.to_json())
-
-    return build('gmail', 'v1', credentials=creds)
+    creds = get_google_credentials()
+    return get_service('gmail', 'v1', creds)
 
 
 def send_email(to: str, subject: str, message_text: str) -> dict:
@@ -61,44 +66,458 @@ def send_email(to: str, subject: str, message_text: str) -> dict:
         dict: Response from Gmail API
     """
     service = get_gmail_service()
+    body = build_message(to, subject, message_text)
+
+    try:
+        return execute(service.users().messages().send(userId='me', body=body))
+    except Exception as e:
+        logging.error("Failed to send email: %s", str(e))
+        raise
+
+
+def build_message(to: str, subject: str, message_text: str) -> dict:
+    """Render a plain-text email as a messages.send request body."""
     message = MIMEText(message_text)
     message['to'] = to
     message['subject'] = subject
 
     raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-    body = {'raw': raw}
+    return {'raw': raw}
 
-    try:
-        return service.users().messages().send(userId='me', body=body).execute()
-    except Exception as e:
-        logging.error("Failed to send email: %s", str(e))
-        raise
 
+def _part_fields(depth: int) -> str:
+    fields = "mimeType,filename,headers(name,value),body/data"
+    return f"{fields},parts({_part_fields(depth - 1)})" if depth else fields
 
-def get_message_details(service, msg_id: str) -> Dict:
-    """Get detailed message content."""
-    try:
-        message = service.users().messages().get(
+
+# Body requests return the part tree without sizes, IDs or attachment
+# references; attachments over a few KB carry no inline data at all
+BODY_FIELDS = f"id,payload({_part_fields(BODY_PART_DEPTH)})"
+
+
+def message_request(service, msg_id: str, message_format: str = 'metadata'):
+    """
+    Build a messages.get request trimmed to what this module reads.
+    
+    Args:
+        service: Gmail API service object
+        msg_id: Message ID
+        message_format: 'metadata' for display fields, 'full' for the
+            MIME part tree used to read the body, or any other Gmail
+            format as-is
+    
+    Returns:
+        HttpRequest: Request to pass to execute or a batch
+    """
+    messages = service.users().messages()
+    if message_format == 'metadata':
+        return messages.get(
             userId='me',
             id=msg_id,
-            format='full'
-        ).execute()
-
-        headers = message['payload']['headers']
-        subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
-        sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'Unknown')
-        date = next((h['value'] for h in headers if h['name'].lower() == 'date'), 'No Date')
-
-        return {
-            'id': message['id'],
-            'subject': subject,
-            'sender': sender,
-            'date': date,
-            'snippet': message.get('snippet', ''),
-        }
+            format='metadata',
+            metadataHeaders=METADATA_HEADERS,
+            fields=METADATA_FIELDS
+        )
+    if message_format == 'full':
+        return messages.get(userId='me', id=msg_id, format='full', fields=BODY_FIELDS)
+    return messages.get(userId='me', id=msg_id, format=message_format)
+
+
+def _find_part(part: Dict, mime_type: str) -> Optional[Dict]:
+    """Depth-first search for an inline (non-attachment) part of mime_type."""
+    if part.get('mimeType') == mime_type and not part.get('filename') \
+            and part.get('body', {}).get('data'):
+        return part
+    for child in part.get('parts', []):
+        found = _find_part(child, mime_type)
+        if found:
+            return found
+    return None
+
+
+def _decode_part(part: Dict) -> str:
+    header = Message()
+    for h in part.get('headers', []):
+        if h['name'].lower() == 'content-type':
+            header['Content-Type'] = h['value']
+    data = part['body']['data']
+    raw = base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+    try:
+        return raw.decode(header.get_content_charset() or 'utf-8', errors='replace')
+    except LookupError:
+        return raw.decode('utf-8', errors='replace')
+
+
+def parse_message_body(payload: Dict) -> str:
+    """
+    Decode the readable text of a format='full' message payload.
+    
+    Only the preferred body part (text/plain, else text/html with tags
+    stripped) is decoded; attachment parts are skipped.
+    
+    Args:
+        payload: The 'payload' field of a format='full' message
+    
+    Returns:
+        str: Body text, or '' if the message has no text part
+    """
+    part = _find_part(payload, 'text/plain') or _find_part(payload, 'text/html')
+    if part is None:
+        return ''
+    text = _decode_part(part)
+    if part['mimeType'] == 'text/html':
+        text = html.unescape(re.sub(r"<(script|style).*?</\1>|<[^>]+>", " ", text, flags=re.S | re.I))
+        text = re.sub(r"[ \t]+", " ", text)
+    return text.strip()
+
+
+def get_message_body(msg_id: str) -> str:
+    """
+    Return a message's body text, fetching it only on first use.
+    
+    Listing and searching only ever fetch metadata; the message's part
+    tree is downloaded here when a body is actually needed, and the
+    decoded text is kept in the size-bounded body cache. Large
+    attachments come back as references and are never transferred.
+    
+    Args:
+        msg_id: Message ID
+    
+    Returns:
+        str: Body text, truncated to MAX_BODY_CHARS
+    """
+    cache = get_body_cache()
+    body = cache.get(msg_id)
+    if body is None:
+        message = execute(message_request(get_gmail_service(), msg_id, 'full'))
+        body = parse_message_body(message.get('payload', {}))[:MAX_BODY_CHARS]
+        cache.put(msg_id, body)
+    return body
+
+
+def extract_message_details(message: dict) -> Dict:
+    """Pull the display fields out of a raw Gmail message resource."""
+    headers = message['payload']['headers']
+    subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
+    sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'Unknown')
+    date = next((h['value'] for h in headers if h['name'].lower() == 'date'), 'No Date')
+
+    return {
+        'id': message['id'],
+        'subject': subject,
+        'sender': sender,
+        'date': date,
+        'snippet': message.get('snippet', ''),
+        'thread_id': message.get('threadId'),
+        'internal_date': int(message.get('internalDate', 0)),
+        'label_ids': message.get('labelIds', []),
+    }
+
+
+def fetch_messages(
+    service,
+    msg_ids: List[str],
+    message_format: str = 'metadata',
+    batch_size: int = BATCH_SIZE
+) -> List[Optional[dict]]:
+    """
+    Fetch many messages using Gmail batch HTTP requests.
+    
+    Args:
+        service: Gmail API service object
+        msg_ids: Message IDs to fetch
+        message_format: Gmail message format to request
+        batch_size: Maximum sub-requests in flight per batch
+        
+    Returns:
+        List[Optional[dict]]: Message resources in the same order as
+        msg_ids, with None for any sub-request that failed
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    results: List[Optional[dict]] = [None] * len(msg_ids)
+    throttled: List[int] = []
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            if isinstance(exception, HttpError) and is_rate_limited(exception):
+                throttled.append(int(request_id))
+                return
+            logging.error("Error retrieving message %s: %s", request_id, exception)
+            return
+        results[int(request_id)] = response
+
+    for start in range(0, len(msg_ids), batch_size):
+        batch = service.new_batch_http_request(callback=callback)
+        requests = []
+        for index in range(start, min(start + batch_size, len(msg_ids))):
+            request = message_request(service, msg_ids[index], message_format)
+            batch.add(request, request_id=str(index))
+            requests.append(request)
+        try:
+            execute_batch(batch, requests)
+        except HttpError as error:
+            # The whole batch failed; its slots stay None
+            logging.error("Error executing message batch: %s", error)
+
+    # Sub-requests rejected for rate limiting are retried one by one so
+    # they go through the scheduler's backoff and concurrency limits
+    for index in throttled:
+        try:
+            results[index] = execute(message_request(service, msg_ids[index], message_format))
+        except HttpError as error:
+            logging.error("Error retrieving message %s: %s", index, error)
+
+    return results
+
+
+def full_resync(service, cache: MailboxCache, depth: int = FULL_SYNC_SIZE) -> None:
+    """
+    Rebuild the local cache from the newest inbox messages.
+    
+    Args:
+        service: Gmail API service object
+        cache: Mailbox cache to rebuild
+        depth: Number of inbox messages to cache
+    """
+    # Take the history ID first so changes made during the sync are replayed
+    profile = execute(service.users().getProfile(userId='me'))
+
+    msg_ids: List[str] = []
+    page_token = None
+    while len(msg_ids) < depth:
+        results = execute(service.users().messages().list(
+            userId='me',
+            labelIds=['INBOX'],
+            maxResults=min(500, depth - len(msg_ids)),
+            pageToken=page_token
+        ))
+        msg_ids.extend(msg['id'] for msg in results.get('messages', []))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+
+    fetched = fetch_messages(service, msg_ids)
+    cache.replace_all(extract_message_details(m) for m in fetched if m)
+    cache.set_state('history_id', profile['historyId'])
+    cache.set_state('depth', depth)
+
+
+def apply_history(service, cache: MailboxCache, start_history_id: str) -> None:
+    """
+    Replay mailbox changes since start_history_id into the local cache.
+    
+    Raises:
+        HttpError: 404 if the history ID is too old to be replayed
+    """
+    added: Dict[str, None] = {}
+    deleted = set()
+    label_changes = []
+    page_token = None
+
+    while True:
+        response = execute(service.users().history().list(
+            userId='me',
+            startHistoryId=start_history_id,
+            pageToken=page_token
+        ))
+
+        for record in response.get('history', []):
+            for item in record.get('messagesAdded', []):
+                msg_id = item['message']['id']
+                added[msg_id] = None
+                deleted.discard(msg_id)
+            for item in record.get('messagesDeleted', []):
+                msg_id = item['message']['id']
+                deleted.add(msg_id)
+                added.pop(msg_id, None)
+            for item in record.get('labelsAdded', []):
+                label_changes.append((item['message']['id'], item['labelIds'], []))
+            for item in record.get('labelsRemoved', []):
+                label_changes.append((item['message']['id'], [], item['labelIds']))
+
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+
+    for msg_id, labels_added, labels_removed in label_changes:
+        if not cache.update_labels(msg_id, labels_added, labels_removed) \
+                and 'INBOX' in labels_added and msg_id not in deleted:
+            # An uncached message moved (back) into the inbox, e.g. un-archived
+            added[msg_id] = None
+
+    if added:
+        fetched = fetch_messages(service, list(added))
+        cache.store(extract_message_details(m) for m in fetched if m)
+    cache.delete(deleted)
+    get_body_cache().discard(deleted)
+    cache.set_state('history_id', response['historyId'])
+
+
+def sync_mailbox(
+    service,
+    cache: Optional[MailboxCache] = None,
+    depth: int = FULL_SYNC_SIZE
+) -> None:
+    """
+    Bring the local cache up to date, incrementally when possible.
+    
+    Args:
+        service: Gmail API service object
+        cache: Mailbox cache, defaults to the process-wide cache
+        depth: Minimum number of inbox messages the cache should cover
+    """
+    cache = cache or get_mailbox_cache()
+    history_id = cache.get_state('history_id')
+    if history_id is None or int(cache.get_state('depth') or 0) < depth:
+        full_resync(service, cache, depth)
+        return
+
+    try:
+        apply_history(service, cache, history_id)
     except HttpError as error:
-        logging.error(f"Error retrieving message {msg_id}: {error}")
-        return {}
+        if error.resp.status != 404:
+            raise
+        logging.warning("History ID %s expired, running full resync", history_id)
+        full_resync(service, cache, depth)
+
+
+def get_cached_details(service, msg_ids: List[str], store: bool = True) -> List[Dict]:
+    """
+    Return metadata for msg_ids in order, fetching only uncached messages.
+    
+    Args:
+        service: Gmail API service object
+        msg_ids: Message IDs
+        store: Add fetched messages to the mailbox cache
+    """
+    cache = get_mailbox_cache()
+    found = cache.get_many(msg_ids)
+    missing = [msg_id for msg_id in msg_ids if msg_id not in found]
+    if missing:
+        fetched = fetch_messages(service, missing)
+        details = [extract_message_details(m) for m in fetched if m]
+        if store:
+            cache.store(details)
+        found.update((d['id'], d) for d in details)
+    return [found[msg_id] for msg_id in msg_ids if msg_id in found]
+
+
+def _get_prefetch_pool() -> ThreadPoolExecutor:
+    global _prefetch_pool
+    with _prefetch_lock:
+        if _prefetch_pool is None:
+            _prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gmail-prefetch")
+        return _prefetch_pool
+
+
+def _parse_cursor(cursor: Optional[str]) -> Tuple[Optional[str], int]:
+    if not cursor:
+        return None, 0
+    offset, _, page_token = cursor.partition(':')
+    return page_token or None, int(offset)
+
+
+class MessagePager:
+    """
+    Iterate over every message matching a search, one page at a time.
+    
+    Iteration is lazy and holds at most two pages: while the caller works
+    through one page, the next page's listing and metadata are fetched on
+    a background thread. Stopping early (break, close() or islice) drops
+    the prefetch. After each yielded message, cursor resumes the scan
+    right after it, e.g. MessagePager(query, cursor=saved) in a later run.
+    
+    Messages are dicts as returned by extract_message_details.
+    """
+
+    def __init__(
+        self,
+        query: Optional[str] = None,
+        label_ids: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        page_size: int = PAGE_SIZE,
+        cursor: Optional[str] = None
+    ):
+        """
+        Args:
+            query: Gmail search query, e.g. 'from:alice after:2024/01/01'
+            label_ids: Only messages with all of these labels
+            limit: Stop after this many messages; no page beyond it is fetched
+            page_size: Messages listed per request (at most 500)
+            cursor: Resume point from a previous pager's cursor
+        """
+        self.query = query
+        self.label_ids = label_ids
+        self.limit = limit
+        self.page_size = max(1, min(page_size, 500))
+        self.cursor = cursor
+        self.exhausted = False
+        self.pages = 0
+
+    def _fetch_page(
+        self,
+        service,
+        page_token: Optional[str],
+        size: int
+    ) -> Tuple[List[Optional[Dict]], Optional[str]]:
+        params = {'userId': 'me', 'maxResults': size}
+        if self.query:
+            params['q'] = self.query
+        if self.label_ids:
+            params['labelIds'] = self.label_ids
+        if page_token:
+            params['pageToken'] = page_token
+        response = execute(service.users().messages().list(**params))
+        msg_ids = [msg['id'] for msg in response.get('messages', [])]
+        # Scans can cover the whole mailbox, so keep them out of the cache
+        found = {d['id']: d for d in get_cached_details(service, msg_ids, store=False)}
+        # Aligned with the listing (None where a fetch failed) so cursor
+        # offsets stay valid when a resumed fetch succeeds
+        return [found.get(msg_id) for msg_id in msg_ids], response.get('nextPageToken')
+
+    def __iter__(self) -> Iterator[Dict]:
+        service = get_gmail_service()
+        page_token, skip = _parse_cursor(self.cursor)
+        remaining = self.limit
+        # Re-listing the resumed page must still cover the skipped messages
+        size = self.page_size if remaining is None else min(self.page_size, remaining + skip)
+
+        pool = _get_prefetch_pool()
+        pending: Optional[Future] = pool.submit(self._fetch_page, service, page_token, size)
+        try:
+            while pending is not None:
+                details, next_token = pending.result()
+                self.pages += 1
+                # Start on the next page before handing out this one
+                page_left = len(details) - skip
+                more = remaining is None or remaining > page_left
+                pending = None
+                if next_token and more:
+                    size = self.page_size if remaining is None else min(
+                        self.page_size, remaining - page_left
+                    )
+                    pending = pool.submit(self._fetch_page, service, next_token, size)
+
+                for offset in range(skip, len(details)):
+                    if details[offset] is None:
+                        continue
+                    if remaining is not None:
+                        if remaining <= 0:
+                            return
+                        remaining -= 1
+                    self.cursor = f"{offset + 1}:{page_token or ''}"
+                    yield details[offset]
+                if pending is None and next_token and remaining:
+                    # Failed fetches left the page short of the limit
+                    pending = pool.submit(
+                        self._fetch_page, service, next_token, min(self.page_size, remaining)
+                    )
+                skip = 0
+                page_token = next_token
+                self.exhausted = not next_token
+        finally:
+            if pending is not None:
+                pending.cancel()
 
 
 def list_recent_emails(max_results: int = 10) -> List[Dict]:
@@ -112,28 +531,14 @@ def list_recent_emails(max_results: int = 10) -> List[Dict]:
         List[Dict]: List of email details including subject, sender, and snippet
     """
     service = get_gmail_service()
+    cache = get_mailbox_cache()
     try:
-        # Get list of recent message IDs
-        results = service.users().messages().list(
-            userId='me',
-            labelIds=['INBOX'],
-            maxResults=max_results
-        ).execute()
-
-        messages = results.get('messages', [])
-        
-        # Get detailed content for each message
-        emails = []
-        for msg in messages:
-            email_data = get_message_details(service, msg['id'])
-            if email_data:
-                emails.append(email_data)
-        
-        return emails
-
+        sync_mailbox(service, cache, depth=max(FULL_SYNC_SIZE, max_results))
     except HttpError as error:
-        logging.error(f"Error listing emails: {error}")
-        return []
+        # Fall back to whatever the cache already holds
+        logging.error(f"Error syncing mailbox: {error}")
+
+    return cache.recent('INBOX', max_results)
 
 
 # Update your existing list_emails function to use the new functionality
@@ -145,39 +550,17 @@ def list_emails(max_results: int = 10) -> List[Dict]:
 
 def search_emails(query: str, max_results: int = 5) -> List[Dict]:
     """Search emails with specific criteria."""
-    service = get_gmail_service()
     try:
-        results = service.users().messages().list(
-            userId='me',
-            q=query,
-            maxResults=max_results
-        ).execute()
-
-        messages = results.get('messages', [])
         return [
-            parse_email_content(
-                service.users().messages().get(
-                    userId='me',
-                    id=msg['id']
-                ).execute()
-            )
-            for msg in messages
+            {
+                'id': details['id'],
+                'subject': details['subject'],
+                'sender': details['sender'],
+                'snippet': details['snippet'],
+                'date': str(details['internal_date'])
+            }
+            for details in MessagePager(query, limit=max_results)
         ]
     except Exception as e:
         logging.error("Failed to search emails: %s", str(e))
         raise
-
-
-def parse_email_content(message_data: dict) -> dict:
-    """Extract meaningful information from email content."""
-    headers = message_data['payload']['headers']
-    subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '')
-    sender = next((h['value'] for h in headers if h['name'] == 'From'), '')
-    
-    return {
-        'id': message_data['id'],
-        'subject': subject,
-        'sender': sender,
-        'snippet': message_data.get('snippet', ''),
-        'date': message_data['internalDate']
-    }
\ No newline at end of file
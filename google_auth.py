@@ -1,10 +1,19 @@
 """Google API authentication module."""
 
-import os.path
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import List, Optional
+
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 
+import metrics
+
 # Combined scopes for both Gmail and Calendar APIs
 SCOPES = [
     'https://www.googleapis.com/auth/gmail.send',
@@ -12,27 +21,203 @@ SCOPES = [
     'https://www.googleapis.com/auth/calendar'
 ]
 
-def get_google_credentials():
-    """Get and refresh Google API credentials."""
-    creds = None
-    
-    # Look for existing token
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+TOKEN_FILE = 'token.json'
+
+# Refresh this many seconds before expiry, ahead of google-auth's own
+# 3m45s threshold, so requests never find the token stale
+REFRESH_MARGIN = 300
+# Wait before retrying a failed background refresh
+REFRESH_RETRY_DELAY = 30
+# Longest the refresher sleeps before re-checking the expiry
+MAX_REFRESH_SLEEP = 3600
+
+
+def _utcnow() -> datetime:
+    # google-auth keeps expiry as a naive UTC datetime
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _token_mtime(token_file: str) -> Optional[float]:
+    if os.path.exists(token_file):
+        return os.path.getmtime(token_file)
+    return None
+
+
+def save_token(token_file: str, creds: Credentials) -> None:
+    """
+    Write credentials to token_file atomically.
     
-    # If no valid credentials available, let user log in
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+    The JSON goes to a temporary file in the same directory which then
+    replaces the target, so readers never see a half-written token.
+    """
+    directory = os.path.dirname(os.path.abspath(token_file))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.token-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(creds.to_json())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, token_file)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class ManagedCredentials(Credentials):
+    """Credentials that route every refresh through their CredentialManager."""
+
+    manager: Optional['CredentialManager'] = None
+
+    def refresh(self, request) -> None:
+        # Also reached from AuthorizedHttp when a request gets a 401
+        if self.manager is None:
+            super().refresh(request)
         else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', 
-                SCOPES
+            self.manager.refresh(self, request)
+
+
+class CredentialManager:
+    """
+    Process-wide owner of the OAuth credentials for one token file.
+    
+    Credentials live in memory and are shared by every API client. A
+    daemon thread refreshes the token REFRESH_MARGIN seconds before it
+    expires, concurrent refreshes collapse into one token request, and
+    refreshed tokens are persisted atomically. The token file is only
+    re-read when its modification time changes.
+    """
+
+    def __init__(self, token_file: str = TOKEN_FILE, scopes: List[str] = SCOPES):
+        self.token_file = token_file
+        self.scopes = scopes
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._creds: Optional[ManagedCredentials] = None
+        self._mtime: Optional[float] = None
+        self._wake = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    def _adopt(self, creds: Credentials) -> ManagedCredentials:
+        if not isinstance(creds, ManagedCredentials):
+            creds = ManagedCredentials.from_authorized_user_info(
+                json.loads(creds.to_json()), self.scopes
             )
-            creds = flow.run_local_server(port=0)
+        creds.manager = self
+        return creds
+
+    def _load(self) -> Optional[ManagedCredentials]:
+        if self._mtime is None:
+            return None
+        creds = ManagedCredentials.from_authorized_user_file(self.token_file, self.scopes)
+        if not creds.has_scopes(self.scopes):
+            # e.g. a token authorized for fewer APIs; ask for consent again
+            logging.warning("%s lacks required scopes, re-authorizing", self.token_file)
+            return None
+        return self._adopt(creds)
+
+    def _authorize(self) -> ManagedCredentials:
+        flow = InstalledAppFlow.from_client_secrets_file('credentials.json', self.scopes)
+        return self._adopt(flow.run_local_server(port=0))
+
+    def _save(self, creds: Credentials) -> None:
+        save_token(self.token_file, creds)
+        self._mtime = _token_mtime(self.token_file)
+
+    def get(self) -> Credentials:
+        """
+        Return valid credentials, loading or authorizing on first use.
         
-        # Save the credentials for future use
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
-    
-    return creds
\ No newline at end of file
+        The token is normally refreshed in the background before it
+        expires; a caller only blocks on a refresh when the refresher
+        could not keep up (e.g. after the machine slept).
+        
+        Returns:
+            Credentials: Valid Google credentials
+        """
+        with self._lock:
+            mtime = _token_mtime(self.token_file)
+            if self._creds is None or mtime != self._mtime:
+                self._mtime = mtime
+                self._creds = self._load()
+                self._wake.set()
+            creds = self._creds
+
+            if creds is None or not (creds.valid or creds.refresh_token):
+                creds = self._creds = self._authorize()
+                self._save(creds)
+                self._wake.set()
+            self._start_refresher()
+
+        if not creds.valid:
+            creds.refresh(Request())
+        return creds
+
+    def refresh(self, creds: Credentials, request) -> None:
+        """
+        Refresh creds, sharing one token request among concurrent callers.
+        
+        Args:
+            creds: Credentials owned by this manager
+            request: google-auth transport request
+        """
+        token = creds.token
+        with self._refresh_lock:
+            if creds.token != token and creds.valid:
+                # Another thread refreshed while this one waited
+                return
+            with metrics.span('google.credentials_refresh'):
+                Credentials.refresh(creds, request)
+            with self._lock:
+                if creds is self._creds:
+                    self._save(creds)
+        self._wake.set()
+
+    def _seconds_until_refresh(self) -> float:
+        creds = self._creds
+        if creds is None or not creds.refresh_token:
+            return MAX_REFRESH_SLEEP
+        if creds.expiry is None:
+            # Not yet refreshed this session, so the expiry is unknown
+            return 0 if not creds.token else MAX_REFRESH_SLEEP
+        remaining = (creds.expiry - _utcnow()).total_seconds() - REFRESH_MARGIN
+        return min(max(remaining, 0), MAX_REFRESH_SLEEP)
+
+    def _start_refresher(self) -> None:
+        if self._refresher is None:
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name='credential-refresher', daemon=True
+            )
+            self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            if self._wake.wait(self._seconds_until_refresh()):
+                # Credentials changed; recompute the deadline
+                self._wake.clear()
+                continue
+            creds = self._creds
+            if creds is None or not creds.refresh_token:
+                continue
+            try:
+                creds.refresh(Request())
+            except Exception as e:
+                logging.error("Background token refresh failed: %s", str(e))
+                self._wake.wait(REFRESH_RETRY_DELAY)
+
+
+_manager: Optional[CredentialManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_credential_manager() -> CredentialManager:
+    """Return the process-wide CredentialManager for token.json."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = CredentialManager()
+        return _manager
+
+
+def get_google_credentials():
+    """Get and refresh Google API credentials."""
+    return get_credential_manager().get()
@@ -0,0 +1,354 @@
+"""Local intent and slot parser that answers routine requests without the LLM."""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dateutil import parser as date_parser
+from dateutil.relativedelta import relativedelta, MO, TU, WE, TH, FR, SA, SU
+
+# Intents scoring below this are handed to the model instead
+CONFIDENCE_THRESHOLD = 0.8
+DEFAULT_SLOT_MINUTES = 60
+
+_WEEKDAYS = {
+    'monday': MO, 'tuesday': TU, 'wednesday': WE, 'thursday': TH,
+    'friday': FR, 'saturday': SA, 'sunday': SU,
+}
+
+_MONTHS = {
+    name: number
+    for number, names in enumerate((
+        ('january', 'jan'), ('february', 'feb'), ('march', 'mar'), ('april', 'apr'),
+        ('may',), ('june', 'jun'), ('july', 'jul'), ('august', 'aug'),
+        ('september', 'sep', 'sept'), ('october', 'oct'), ('november', 'nov'),
+        ('december', 'dec'),
+    ), start=1)
+    for name in names
+}
+
+_POLITE = re.compile(
+    r"^(?:hey |hi )?(?:please |can you |could you |would you |will you |i want to |i'd like to )*"
+)
+_TRAILING = re.compile(r"(?: please| for me| thanks| thank you)+$")
+# Joined requests ("... and draft a reply") need the model
+_COMPOUND = re.compile(r"\b(?:and|then|also)\b")
+# Search terms may contain "and" ("about sales and marketing"), so for
+# search only a conjunction followed by another request counts
+_FOLLOW_UP = re.compile(
+    r"\b(?:and|then|also)(?: then| also)? (?:(?:please|can you|could you) )?"
+    r"(?:draft|reply|respond|answer|summari[sz]e|send|forward|delete|archive|mark|"
+    r"tell|write|compose|schedule|add|create|book|move|cancel|remind|show|list|find|"
+    r"get|check|read|explain|translate|give|make|let|what|how|who|when|why)\b"
+)
+
+# A search term is a single clause; a comma, inner question mark or a
+# question/modal word means the request goes on to ask something else
+# ("emails from mom saying she is sick, what should i do")
+_CLAUSE_BREAK = re.compile(
+    r"[,;?]|\b(?:what|why|how|when|where|who|which|should|could|would|can|will|"
+    r"shall|must|might|is it|are they|do i|does|did)\b"
+)
+
+_EMAIL_NOUN = r"(?:e-?mails?|mails?|messages?)"
+_EVENT_NOUN = r"(?:events?|calendar|agenda|schedule|meetings?|appointments?)"
+
+_TIME_PATTERN = re.compile(
+    r"(?:\bat |\b@ ?)?\b(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))? ?(?P<ampm>am|pm)\b"
+    r"|(?:\bat )\b(?P<hour24>\d{1,2}):(?P<minute24>\d{2})\b"
+    r"|(?:\bat )?\b(?P<noon>noon|midday)\b"
+)
+
+
+@dataclass
+class Intent:
+    """A recognized request with its resolved slots."""
+    name: str
+    confidence: float
+    slots: Dict = field(default_factory=dict)
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and politeness so patterns stay simple."""
+    text = text.lower().strip()
+    text = re.sub(r"[?!.,]+$", "", text)
+    text = re.sub(r"\s+", " ", text)
+    text = _POLITE.sub("", text)
+    return _TRAILING.sub("", text).strip()
+
+
+def _day_start(day: datetime) -> datetime:
+    return datetime.combine(day.date(), time())
+
+
+def resolve_range(text: str, now: datetime) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Resolve a date expression to a [start, end) range of naive local times.
+    
+    Understands today, tonight, tomorrow, weekday names (optionally with
+    this/next/on), this/next week, this/next month, month names (the
+    whole month), in N days, and anything dateutil can parse such as
+    'june 5' or '2024-06-05'. Dates and months given without a year
+    that have already passed mean their next occurrence; a bare number
+    is too ambiguous and is not resolved.
+    
+    Returns:
+        Optional[Tuple[datetime, datetime]]: Range, or None if unrecognized
+    """
+    text = re.sub(r"^(?:on|for|from|in the|during) ", "", text.strip())
+    today = _day_start(now)
+    if text in ("", "today", "tonight", "this evening", "this afternoon"):
+        return today, today + timedelta(days=1)
+    if text == "tomorrow":
+        return today + timedelta(days=1), today + timedelta(days=2)
+    if text in ("this week", "the rest of the week", "the week"):
+        return today, today + relativedelta(days=1, weekday=MO(+1))
+    if text == "next week":
+        start = today + relativedelta(days=1, weekday=MO(+1))
+        return start, start + timedelta(days=7)
+    if text in ("the weekend", "this weekend"):
+        start = today + relativedelta(weekday=SA(+1))
+        return start, start + timedelta(days=2)
+
+    match = re.fullmatch(r"in (\d+) days?", text)
+    if match:
+        start = today + timedelta(days=int(match.group(1)))
+        return start, start + timedelta(days=1)
+    match = re.fullmatch(r"(?:the )?next (\d+) days", text)
+    if match:
+        return today, today + timedelta(days=int(match.group(1)))
+
+    match = re.fullmatch(r"(this |next )?(%s)" % "|".join(_WEEKDAYS), text)
+    if match:
+        # "friday" may mean today; "next friday" is always a later day
+        skip = 1 if match.group(1) == "next " else 0
+        start = today + relativedelta(days=skip, weekday=_WEEKDAYS[match.group(2)](+1))
+        return start, start + timedelta(days=1)
+
+    month_start = today.replace(day=1)
+    if text == "this month":
+        return today, month_start + relativedelta(months=1)
+    if text == "next month":
+        return month_start + relativedelta(months=1), month_start + relativedelta(months=2)
+    match = re.fullmatch(r"(?:in |this |next )?(%s)(?: (\d{4}))?" % "|".join(_MONTHS), text)
+    if match:
+        start = datetime(int(match.group(2) or now.year), _MONTHS[match.group(1)], 1)
+        if not match.group(2) and start + relativedelta(months=1) <= today:
+            start += relativedelta(years=1)
+        return start, start + relativedelta(months=1)
+
+    if not re.search(r"[a-z]|\d+[-/.]\d+", text):
+        # "2" or "15": a day of which month?
+        return None
+    try:
+        day = date_parser.parse(text, default=today)
+    except (ValueError, OverflowError):
+        return None
+    day = _day_start(day)
+    if day < today and not re.search(r"\b\d{4}\b", text):
+        # "may 5" in October is next May
+        day += relativedelta(years=1)
+    return day, day + timedelta(days=1)
+
+
+def split_time(text: str) -> Tuple[str, Optional[time]]:
+    """Pull a clock time such as 'at 3pm', '10:30 am' or 'noon' out of text."""
+    match = _TIME_PATTERN.search(text)
+    if not match:
+        return text, None
+    if match.group('noon'):
+        clock = time(12)
+    elif match.group('hour24'):
+        clock = time(int(match.group('hour24')), int(match.group('minute24')))
+    else:
+        hour = int(match.group('hour')) % 12
+        if match.group('ampm') == 'pm':
+            hour += 12
+        clock = time(hour, int(match.group('minute') or 0))
+    rest = (text[:match.start()] + " " + text[match.end():]).strip()
+    return re.sub(r"\s+", " ", rest), clock
+
+
+def _minutes(amount: Optional[str], unit: Optional[str]) -> int:
+    if not amount:
+        return DEFAULT_SLOT_MINUTES
+    value = int(amount)
+    return value * 60 if unit and unit.startswith('h') else value
+
+
+# Intent parsers: (compiled pattern, base confidence, slot builder)
+SlotBuilder = Callable[[re.Match, datetime], Optional[Dict]]
+
+
+def _list_emails(match: re.Match, now: datetime) -> Optional[Dict]:
+    count = match.group('count')
+    return {'max_results': min(int(count), 50) if count else 5}
+
+
+def _search_emails(match: re.Match, now: datetime) -> Optional[Dict]:
+    relation, term = match.group('relation'), match.group('term').strip()
+    if _CLAUSE_BREAK.search(term):
+        return None
+    if relation == 'from':
+        return {'query': f"from:{term}"}
+    if relation in ('with subject', 'titled'):
+        return {'query': f'subject:"{term}"'}
+    return {'query': term}
+
+
+def _list_events(match: re.Match, now: datetime) -> Optional[Dict]:
+    when = (match.group('when') or "").strip()
+    span = resolve_range(when, now)
+    if span is None:
+        return None
+    if not when:
+        # No date given: the coming week, like "list events"
+        span = (now, _day_start(now) + timedelta(days=7))
+    return {'start': max(span[0], now) if span[1] > now else span[0],
+            'end': span[1], 'when': when or "the next 7 days"}
+
+
+def _is_free(match: re.Match, now: datetime) -> Optional[Dict]:
+    when, amount, unit = match.group('when') or "", match.group('amount'), match.group('unit')
+    trailing = _TRAILING_DURATION.search(when)
+    if trailing and not amount:
+        # "am i free friday at 3pm for 30 minutes"
+        when, amount, unit = when[:trailing.start()], trailing.group(1), trailing.group(2)
+    rest, clock = split_time(when)
+    if clock is None:
+        return None
+    span = resolve_range(rest, now)
+    if span is None:
+        return None
+    start = datetime.combine(span[0].date(), clock)
+    minutes = _minutes(amount, unit)
+    return {'start': start, 'end': start + timedelta(minutes=minutes), 'minutes': minutes}
+
+
+def _find_slot(match: re.Match, now: datetime) -> Optional[Dict]:
+    span = resolve_range(match.group('when') or "this week", now)
+    if span is None:
+        return None
+    return {
+        'start': max(span[0], now),
+        'end': span[1],
+        'minutes': _minutes(match.group('amount'), match.group('unit')),
+    }
+
+
+_DURATION = r"(?:(?P<amount>\d+)[ -]?(?P<unit>minutes?|mins?|hours?|hrs?|h)\b)"
+_TRAILING_DURATION = re.compile(r"(?:^| )for (\d+)[ -]?(minutes?|mins?|hours?|hrs?|h)$")
+
+PATTERNS: List[Tuple[str, re.Pattern, float, SlotBuilder]] = [
+    ('search_emails', re.compile(
+        r"(?:(?:show|list|get|find|search|check)(?: for)?(?: me)? )?(?:(?:all|any|my|the) )*"
+        + _EMAIL_NOUN + r" (?P<relation>from|about|regarding|mentioning|with subject|titled) "
+        r"(?P<term>.+)"
+    ), 0.9, _search_emails),
+    ('list_emails', re.compile(
+        r"(?:(?:show|list|get|check|read|display|open)(?: me)? )?(?:(?:all|any|my|the) )*"
+        r"(?:(?P<count>\d+) )?(?:(?:recent|latest|new|newest|last|unread) )*(?:" + _EMAIL_NOUN
+        + r"|inbox)|what(?:'s| is) in my inbox|(?:do i have )?any new " + _EMAIL_NOUN
+    ), 0.95, _list_emails),
+    ('is_free', re.compile(
+        r"am i (?:free|available|busy)(?: for " + _DURATION + r")?(?: (?P<when>.+))?"
+        r"|(?:do i have|is there) (?:anything|something)(?: (?:on|scheduled|booked))? (?P<when2>.+)"
+    ), 0.9, _is_free),
+    ('find_slot', re.compile(
+        r"(?:find|get|suggest|when can i get)(?: me)? (?:a |an |some )?(?:free )?"
+        r"(?:" + _DURATION + r" )?(?:free )?(?:slot|time|window|gap|opening)s?"
+        r"(?: for (?:a )?(?:meeting|call))?(?: (?P<when>.+))?"
+    ), 0.9, _find_slot),
+    ('list_events', re.compile(
+        r"(?:(?:show|list|get|display|check)(?: me)? )?(?:(?:all|my|the) )*" + _EVENT_NOUN
+        + r"(?: (?P<when>.+))?"
+        r"|what(?:'s| is| do i have)(?: going)? on(?: my (?:calendar|schedule|agenda))?"
+        r"(?: (?P<when2>.+))?"
+        r"|what (?:meetings|events) do i have(?: (?P<when3>.+))?"
+    ), 0.9, _list_events),
+]
+
+
+class _MergedMatch:
+    """Exposes alternation groups (when2, when3) under their primary name."""
+
+    def __init__(self, match: re.Match):
+        self._match = match
+
+    def group(self, name: str):
+        groups = self._match.groupdict()
+        value = groups.get(name)
+        if value is None:
+            for suffix in ('2', '3'):
+                value = groups.get(name + suffix)
+                if value is not None:
+                    break
+        return value
+
+
+class RouterStats:
+    """Counts of requests answered locally versus handed to the model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routed: Dict[str, int] = {}
+        self.fallbacks = 0
+
+    def record(self, intent: Optional[Intent]) -> None:
+        with self._lock:
+            if intent is None:
+                self.fallbacks += 1
+            else:
+                self.routed[intent.name] = self.routed.get(intent.name, 0) + 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = sum(self.routed.values()) + self.fallbacks
+        return sum(self.routed.values()) / total if total else 0.0
+
+
+stats = RouterStats()
+
+
+def parse(text: str, now: Optional[datetime] = None) -> Optional[Intent]:
+    """
+    Recognize text as a known intent, regardless of confidence.
+    
+    Args:
+        text: Raw user input
+        now: Current naive local time (for relative dates)
+    
+    Returns:
+        Optional[Intent]: Best match, or None
+    """
+    now = now or datetime.now()
+    normalized = normalize(text)
+    for name, pattern, confidence, build in PATTERNS:
+        match = pattern.fullmatch(normalized)
+        if not match:
+            continue
+        slots = build(_MergedMatch(match), now)
+        if slots is None:
+            # The shape matched but its slots did not resolve cleanly
+            return Intent(name, confidence * 0.5)
+        compound = _FOLLOW_UP if name == 'search_emails' else _COMPOUND
+        if compound.search(normalized):
+            confidence *= 0.7
+        return Intent(name, confidence, slots)
+    return None
+
+
+def route(text: str, now: Optional[datetime] = None) -> Optional[Intent]:
+    """
+    Return the intent for text if it clears CONFIDENCE_THRESHOLD.
+    
+    Every call is counted in stats, so stats.hit_rate is the share of
+    free-form requests answered without an LLM call.
+    """
+    intent = parse(text, now)
+    if intent is not None and intent.confidence < CONFIDENCE_THRESHOLD:
+        intent = None
+    stats.record(intent)
+    return intent
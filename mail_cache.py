@@ -0,0 +1,257 @@
+"""Local on-disk cache of Gmail message metadata."""
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+# Define constants
+CACHE_FILE = "cache/mailbox.db"
+# Decoded message bodies kept in memory, in characters across all bodies
+BODY_CACHE_CHARS = 2_000_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    thread_id TEXT,
+    subject TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    date TEXT NOT NULL,
+    snippet TEXT NOT NULL,
+    internal_date INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS messages_internal_date ON messages (internal_date);
+CREATE TABLE IF NOT EXISTS message_labels (
+    message_id TEXT NOT NULL REFERENCES messages (id) ON DELETE CASCADE,
+    label_id TEXT NOT NULL,
+    PRIMARY KEY (label_id, message_id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class MailboxCache:
+    """SQLite store for message metadata and the Gmail history cursor."""
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get_state(self, key: str) -> Optional[str]:
+        """Return a sync state value such as the stored history ID."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM sync_state WHERE key = ?", (key,)
+            ).fetchone()
+        return row['value'] if row else None
+
+    def set_state(self, key: str, value: str) -> None:
+        """Persist a sync state value."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                (key, str(value))
+            )
+
+    def store(self, messages: Iterable[Dict]) -> None:
+        """
+        Insert or replace message metadata.
+        
+        Args:
+            messages: Dicts with id, subject, sender, date, snippet and
+                optionally thread_id, internal_date and label_ids
+        """
+        with self._lock, self._connect() as conn:
+            self._store(conn, messages)
+
+    def replace_all(self, messages: Iterable[Dict]) -> None:
+        """Atomically swap the cached messages for a freshly synced set."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM messages")
+            self._store(conn, messages)
+
+    def _store(self, conn: sqlite3.Connection, messages: Iterable[Dict]) -> None:
+        for msg in messages:
+            conn.execute(
+                "INSERT OR REPLACE INTO messages "
+                "(id, thread_id, subject, sender, date, snippet, internal_date) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    msg['id'],
+                    msg.get('thread_id'),
+                    msg['subject'],
+                    msg['sender'],
+                    msg['date'],
+                    msg['snippet'],
+                    int(msg.get('internal_date') or 0),
+                )
+            )
+            conn.execute(
+                "DELETE FROM message_labels WHERE message_id = ?", (msg['id'],)
+            )
+            conn.executemany(
+                "INSERT INTO message_labels (message_id, label_id) VALUES (?, ?)",
+                [(msg['id'], label) for label in msg.get('label_ids', [])]
+            )
+
+    def delete(self, msg_ids: Iterable[str]) -> None:
+        """Remove messages from the cache."""
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM messages WHERE id = ?", [(i,) for i in msg_ids]
+            )
+
+    def update_labels(
+        self,
+        msg_id: str,
+        added: Iterable[str] = (),
+        removed: Iterable[str] = ()
+    ) -> bool:
+        """Apply label changes to a cached message; False if it is not cached."""
+        with self._lock, self._connect() as conn:
+            if not conn.execute(
+                "SELECT 1 FROM messages WHERE id = ?", (msg_id,)
+            ).fetchone():
+                return False
+            conn.executemany(
+                "INSERT OR IGNORE INTO message_labels (message_id, label_id) VALUES (?, ?)",
+                [(msg_id, label) for label in added]
+            )
+            conn.executemany(
+                "DELETE FROM message_labels WHERE message_id = ? AND label_id = ?",
+                [(msg_id, label) for label in removed]
+            )
+        return True
+
+    def clear(self) -> None:
+        """Drop all cached messages and sync state."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM messages")
+            conn.execute("DELETE FROM sync_state")
+
+    def get(self, msg_id: str) -> Optional[Dict]:
+        """Return cached metadata for one message, or None."""
+        found = self.get_many([msg_id])
+        return found.get(msg_id)
+
+    def get_many(self, msg_ids: List[str]) -> Dict[str, Dict]:
+        """Return cached metadata keyed by message ID for the IDs present."""
+        if not msg_ids:
+            return {}
+        placeholders = ",".join("?" * len(msg_ids))
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT * FROM messages WHERE id IN ({placeholders})", msg_ids
+            ).fetchall()
+            return {row['id']: self._row_to_dict(row) for row in rows}
+
+    def recent(self, label_id: str = 'INBOX', limit: int = 10) -> List[Dict]:
+        """Return the newest cached messages carrying a label."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT m.* FROM messages m "
+                "JOIN message_labels l ON l.message_id = m.id "
+                "WHERE l.label_id = ? "
+                "ORDER BY m.internal_date DESC LIMIT ?",
+                (label_id, limit)
+            ).fetchall()
+            return [self._row_to_dict(row) for row in rows]
+
+    def count(self, label_id: str = 'INBOX') -> int:
+        """Return the number of cached messages carrying a label."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT COUNT(*) FROM message_labels WHERE label_id = ?",
+                (label_id,)
+            ).fetchone()
+        return row[0]
+
+    def _row_to_dict(self, row: sqlite3.Row) -> Dict:
+        labels = self._conn.execute(
+            "SELECT label_id FROM message_labels WHERE message_id = ?", (row['id'],)
+        ).fetchall()
+        return {
+            'id': row['id'],
+            'thread_id': row['thread_id'],
+            'subject': row['subject'],
+            'sender': row['sender'],
+            'date': row['date'],
+            'snippet': row['snippet'],
+            'internal_date': row['internal_date'],
+            'label_ids': [label[0] for label in labels],
+        }
+
+
+class BodyCache:
+    """In-memory LRU of decoded message bodies bounded by total size."""
+
+    def __init__(self, max_chars: int = BODY_CACHE_CHARS):
+        self.max_chars = max_chars
+        self.size = 0
+        self._lock = threading.Lock()
+        self._bodies: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, msg_id: str) -> Optional[str]:
+        with self._lock:
+            body = self._bodies.get(msg_id)
+            if body is not None:
+                self._bodies.move_to_end(msg_id)
+            return body
+
+    def put(self, msg_id: str, body: str) -> None:
+        if len(body) > self.max_chars:
+            return
+        with self._lock:
+            previous = self._bodies.pop(msg_id, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._bodies[msg_id] = body
+            self.size += len(body)
+            while self.size > self.max_chars:
+                _, evicted = self._bodies.popitem(last=False)
+                self.size -= len(evicted)
+
+    def discard(self, msg_ids: Iterable[str]) -> None:
+        with self._lock:
+            for msg_id in msg_ids:
+                body = self._bodies.pop(msg_id, None)
+                if body is not None:
+                    self.size -= len(body)
+
+
+_cache: Optional[MailboxCache] = None
+_body_cache: Optional[BodyCache] = None
+
+
+def get_mailbox_cache() -> MailboxCache:
+    """Return the process-wide mailbox cache."""
+    global _cache
+    if _cache is None:
+        _cache = MailboxCache()
+    return _cache
+
+
+def get_body_cache() -> BodyCache:
+    """Return the process-wide message body cache."""
+    global _body_cache
+    if _body_cache is None:
+        _body_cache = BodyCache()
+    return _body_cache
@@ -0,0 +1,209 @@
+"""Mail-merge sending over the shared Gmail service."""
+
+import csv
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from string import Template
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from gmail_integration import build_message, get_gmail_service
+from service_registry import execute
+
+# Concurrent senders; each worker thread keeps its own keep-alive transport
+MAIL_MERGE_WORKERS = 4
+
+
+def load_template(path: str) -> Tuple[Template, Template]:
+    """
+    Read a mail-merge template.
+    
+    The first line must be 'Subject: ...'; the body follows after a blank
+    line. Placeholders use $field or ${field} and are filled from the
+    recipient file's columns.
+    
+    Returns:
+        Tuple[Template, Template]: Subject and body templates
+    """
+    with open(path, encoding='utf-8') as f:
+        first_line = f.readline()
+        if not first_line.lower().startswith('subject:'):
+            raise ValueError("Template must start with a 'Subject:' line")
+        body = f.read()
+    return Template(first_line[len('subject:'):].strip()), Template(body.lstrip('\r\n'))
+
+
+class SendJournal:
+    """
+    Append-only JSONL record of mail-merge progress.
+    
+    A recipient is journaled as 'pending' before its send starts and as
+    'sent' or 'failed' afterwards. On resume, 'sent' and 'pending' keys
+    are both skipped: a pending entry means the process died mid-send,
+    and not resending is the safe choice for email.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.states: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn final line from a crash
+                    self.states[record['key']] = record['state']
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def record(self, key: str, state: str, **extra) -> None:
+        """Durably append a state change for key."""
+        line = json.dumps({'key': key, 'state': state, 'ts': time.time(), **extra})
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.states[key] = state
+
+    def close(self) -> None:
+        """Close the journal file."""
+        self._file.close()
+
+
+def message_key(to: str, subject: str, body: str, occurrence: int = 1) -> str:
+    """
+    Return the journal key for one rendered message.
+    
+    The key depends on the recipient and content rather than the CSV row,
+    so inserting or removing rows before a resume cannot make an already
+    sent message look new. Identical rows are numbered by occurrence
+    (the second copy gets '#2'), so an intentional duplicate is still
+    sent once per row.
+    """
+    digest = hashlib.sha256(f"{subject}\0{body}".encode('utf-8')).hexdigest()[:16]
+    key = f"{to.lower()}:{digest}"
+    return key if occurrence == 1 else f"{key}#{occurrence}"
+
+
+def iter_messages(
+    recipients_path: str,
+    subject: Template,
+    body: Template,
+    done: Set[str],
+    skipped: Optional[List[str]] = None
+) -> Iterator[Tuple[str, str, Optional[dict], Optional[str]]]:
+    """
+    Stream rendered messages for recipients not yet handled.
+    
+    Keys passed over because they are in done are appended to skipped.
+    
+    Yields:
+        Tuple: (journal key, recipient, send body or None, render error or None)
+    """
+    occurrences: Dict[str, int] = {}
+    with open(recipients_path, newline='', encoding='utf-8') as f:
+        for line_no, row in enumerate(csv.DictReader(f), start=2):
+            to = (row.get('email') or '').strip()
+            if not to:
+                yield f"line {line_no}", to, None, "missing email column value"
+                continue
+            try:
+                rendered_subject, rendered_body = subject.substitute(row), body.substitute(row)
+            except (KeyError, ValueError) as e:
+                yield f"line {line_no}:{to}", to, None, f"template field error: {e}"
+                continue
+            key = message_key(to, rendered_subject, rendered_body)
+            occurrences[key] = occurrences.get(key, 0) + 1
+            if occurrences[key] > 1:
+                key = message_key(to, rendered_subject, rendered_body, occurrences[key])
+            if key in done:
+                if skipped is not None:
+                    skipped.append(key)
+                continue
+            try:
+                message = build_message(to, rendered_subject, rendered_body)
+            except ValueError as e:
+                yield key, to, None, f"message error: {e}"
+                continue
+            yield key, to, message, None
+
+
+def mail_merge(
+    template_path: str,
+    recipients_path: str,
+    journal_path: Optional[str] = None,
+    workers: int = MAIL_MERGE_WORKERS
+) -> Dict:
+    """
+    Send a templated email to every recipient in a CSV file.
+    
+    Messages are rendered lazily and sent by a pool of workers, with at
+    most 2 * workers messages rendered ahead of the senders. Re-running
+    with the same journal resumes where the previous run stopped.
+    
+    Args:
+        template_path: Template file (see load_template)
+        recipients_path: CSV with an 'email' column plus template fields
+        journal_path: Progress journal, defaults to recipients_path + '.journal'
+        workers: Number of concurrent senders
+    
+    Returns:
+        Dict: Counts of sent, failed, skipped (rows of this file done in an
+        earlier run) and uncertain (interrupted mid-send earlier) rows, elapsed
+        seconds and messages per second
+    """
+    subject, body = load_template(template_path)
+    journal = SendJournal(journal_path or f"{recipients_path}.journal")
+    previous = dict(journal.states)
+    done = {key for key, state in previous.items() if state in ('sent', 'pending')}
+    service = get_gmail_service()
+
+    counts = {'sent': 0, 'failed': 0}
+    skipped: List[str] = []
+    counts_lock = threading.Lock()
+    slots = threading.BoundedSemaphore(2 * workers)
+
+    def send(key: str, to: str, message: dict) -> None:
+        try:
+            journal.record(key, 'pending', to=to)
+            response = execute(service.users().messages().send(userId='me', body=message))
+            journal.record(key, 'sent', to=to, id=response.get('id'))
+            outcome = 'sent'
+        except Exception as e:
+            logging.error("Mail merge send to %s failed: %s", to, str(e))
+            journal.record(key, 'failed', to=to, error=str(e))
+            outcome = 'failed'
+        finally:
+            slots.release()
+        with counts_lock:
+            counts[outcome] += 1
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mail-merge") as pool:
+            for key, to, message, error in iter_messages(
+                recipients_path, subject, body, done, skipped
+            ):
+                if error:
+                    journal.record(key, 'failed', to=to, error=error)
+                    with counts_lock:
+                        counts['failed'] += 1
+                    continue
+                slots.acquire()
+                pool.submit(send, key, to, message)
+    finally:
+        journal.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        **counts,
+        'skipped': sum(1 for key in skipped if previous[key] == 'sent'),
+        'uncertain': sum(1 for key in skipped if previous[key] == 'pending'),
+        'seconds': elapsed,
+        'messages_per_second': counts['sent'] / elapsed if elapsed else 0.0,
+    }
@@ -1,26 +1,54 @@
 """Personal Agent main module for handling user interactions and commands."""
 
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+import asyncio
 import logging
+import os
+import sys
+import threading
+import time
 
-from agent import run_agent
-from memory.memory import update_memory, retrieve_context
-from gmail_integration import send_email, list_emails
-from calendar_integration import (
-    add_event,
-    list_upcoming_events,
-    parse_date_time,
-    format_event_time
-)
+import async_api
+import config
+import metrics
 
+# Heavy modules (openai, the Google client stack, pytz) are imported inside
+# the handlers that need them so the prompt appears without loading them
 
-def handle_email_send(user_input: str) -> None:
+# Memory writes still in flight; they run while the next prompt is read
+_pending_writes: Set[asyncio.Task] = set()
+
+
+def remember(user_input: str, response: str) -> None:
+    """Persist an exchange in the background without blocking the REPL."""
+    task = asyncio.ensure_future(async_api.update_memory(user_input, response))
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+
+
+async def flush_memory() -> None:
+    """Wait for background memory writes to finish."""
+    if _pending_writes:
+        await asyncio.gather(*_pending_writes, return_exceptions=True)
+
+
+def _queued_message(job: Dict, what: str) -> str:
+    if job['duplicate']:
+        return f"{what} is already queued as job {job['id']}."
+    return f"{what} queued as job {job['id']}. Type 'jobs' to check on it."
+
+
+async def handle_email_send(user_input: str) -> None:
     """
     Handle the email sending command.
     
+    The email goes to the outbox and is sent in the background.
+    
     Args:
         user_input: Raw user input containing email details
     """
+    import outbox
     try:
         parts = user_input.split("|")
         if len(parts) != 4:
@@ -32,39 +60,88 @@ def handle_email_send(user_input: str) -> None:
             return
 
         _, to, subject, body = parts
-        send_email(to.strip(), subject.strip(), body.strip())
-        print("Agent: Email sent successfully!")
-        update_memory(user_input, "Email sent successfully!")
+        job = await async_api.run_blocking(
+            outbox.queue_email, to.strip(), subject.strip(), body.strip()
+        )
+        result = _queued_message(job, "Email")
+        print(f"Agent: {result}")
+        remember(user_input, result)
+    except Exception as e:
+        error_msg = f"Failed to queue email: {str(e)}"
+        print(f"Agent: {error_msg}")
+        remember(user_input, error_msg)
+
+
+async def handle_mail_merge(user_input: str) -> None:
+    """Handle sending a templated email to a list of recipients."""
+    try:
+        # Format: mail merge|template.txt|recipients.csv
+        parts = user_input.split("|")
+        if len(parts) != 3:
+            print("Agent: Please use format: mail merge|template.txt|recipients.csv")
+            return
+
+        _, template_path, recipients_path = parts
+        report = await async_api.mail_merge_send(template_path.strip(), recipients_path.strip())
+        result = (
+            f"Mail merge sent {report['sent']} message(s), {report['failed']} failed, "
+            f"{report['skipped']} already sent earlier "
+            f"({report['messages_per_second']:.1f} messages/s)."
+        )
+        if report['uncertain']:
+            result += (
+                f" {report['uncertain']} recipient(s) were interrupted mid-send in an "
+                "earlier run and were not retried."
+            )
+        print(f"Agent: {result}")
+        remember(user_input, result)
     except Exception as e:
-        error_msg = f"Failed to send email: {str(e)}"
+        error_msg = f"Failed to run mail merge: {str(e)}"
         print(f"Agent: {error_msg}")
-        update_memory(user_input, error_msg)
+        remember(user_input, error_msg)
 
 
-def handle_email_list(max_results: int = 5) -> None:
+def print_emails(emails: List[Dict]) -> None:
+    """Print a list of email summaries."""
+    for idx, email in enumerate(emails, 1):
+        print(f"\n{idx}. From: {email['sender']}")
+        print(f"   Subject: {email['subject']}")
+        print(f"   Date: {email['date']}")
+        print(f"   Preview: {email['snippet']}")
+
+
+def print_events(events: List[Dict]) -> None:
+    """Print a list of calendar events."""
+    from calendar_integration import format_event_time
+    for idx, event in enumerate(events, 1):
+        time_str = format_event_time(event)
+        print(f"{idx}. {event['summary']} - {time_str}")
+        if event.get('location'):
+            print(f"   Location: {event['location']}")
+
+
+async def handle_email_list(max_results: int = 5) -> None:
     """Handle the email listing command."""
     try:
-        emails = list_emails(max_results)
+        emails = await async_api.list_emails(max_results)
         if not emails:
             print("Agent: No emails found.")
             return
 
         print("Agent: Here are your recent emails:")
-        for idx, email in enumerate(emails, 1):
-            print(f"\n{idx}. From: {email['sender']}")
-            print(f"   Subject: {email['subject']}")
-            print(f"   Date: {email['date']}")
-            print(f"   Preview: {email['snippet']}")
+        print_emails(emails)
 
-        update_memory("list emails", "Listed recent emails successfully")
+        remember("list emails", "Listed recent emails successfully")
     except Exception as e:
         error_msg = f"Failed to list emails: {str(e)}"
         print(f"Agent: {error_msg}")
-        update_memory("list emails", error_msg)
+        remember("list emails", error_msg)
 
 
-def handle_calendar_add(user_input: str) -> None:
-    """Handle adding calendar events."""
+async def handle_calendar_add(user_input: str) -> None:
+    """Handle adding calendar events through the outbox."""
+    import outbox
+    from calendar_integration import parse_date_time
     try:
         # Format: add event|Summary|YYYY-MM-DD|HH:MM|[location]|[description]
         parts = user_input.split("|")
@@ -77,93 +154,577 @@ def handle_calendar_add(user_input: str) -> None:
         description = extras[1] if len(extras) > 1 else None
 
         start_time = parse_date_time(date_str.strip(), time_str.strip())
-        result = add_event(
+        job = await async_api.run_blocking(
+            outbox.queue_add_event,
             summary.strip(),
             start_time,
             description=description,
             location=location
         )
+        result = _queued_message(job, "Event")
         print(f"Agent: {result}")
-        update_memory(user_input, result)
+        remember(user_input, result)
 
     except Exception as e:
         error_msg = f"Failed to add event: {str(e)}"
         print(f"Agent: {error_msg}")
-        update_memory(user_input, error_msg)
+        remember(user_input, error_msg)
 
 
-def handle_calendar_list() -> None:
+async def handle_calendar_delete(user_input: str) -> None:
+    """Handle deleting a calendar event through the outbox."""
+    import outbox
+    try:
+        # Format: delete event|EVENT_ID
+        parts = user_input.split("|")
+        if len(parts) != 2 or not parts[1].strip():
+            print("Agent: Please use format: delete event|EVENT_ID")
+            return
+
+        job = await async_api.run_blocking(outbox.queue_delete_event, parts[1].strip())
+        result = _queued_message(job, "Event deletion")
+        print(f"Agent: {result}")
+        remember(user_input, result)
+    except Exception as e:
+        error_msg = f"Failed to queue event deletion: {str(e)}"
+        print(f"Agent: {error_msg}")
+        remember(user_input, error_msg)
+
+
+def _describe_job(job: Dict) -> str:
+    payload = job['payload']
+    if job['kind'] == 'send_email':
+        return f"send email to {payload['to']}: {payload['subject']}"
+    if job['kind'] == 'add_event':
+        return f"add event {payload['summary']} at {payload['start_time'][:16].replace('T', ' ')}"
+    return f"delete event {payload['event_id']}"
+
+
+async def handle_jobs() -> None:
+    """Show outbox queue depth and the status of recent jobs."""
+    import outbox
+    box = outbox.get_outbox()
+    depth, jobs = await async_api.run_blocking(
+        lambda: (box.depth(), box.jobs())
+    )
+    if not jobs:
+        print("Agent: The outbox is empty.")
+        return
+
+    print(
+        f"Agent: Outbox has {depth.get(outbox.QUEUED, 0)} queued, "
+        f"{depth.get(outbox.RUNNING, 0)} running, {depth.get(outbox.DONE, 0)} done, "
+        f"{depth.get(outbox.FAILED, 0)} failed."
+    )
+    for job in jobs:
+        line = f"{job['id']}. [{job['status']}] {_describe_job(job)}"
+        if job['status'] == outbox.QUEUED and job['attempts']:
+            line += f" (attempt {job['attempts'] + 1} in {max(0, job['next_attempt'] - time.time()):.0f}s)"
+        print(line)
+        detail = job['result'] if job['status'] == outbox.DONE else job['error']
+        if detail:
+            print(f"   {detail}")
+
+
+async def handle_calendar_list() -> None:
     """Handle listing calendar events."""
     try:
-        events = list_upcoming_events(max_results=5)
+        events = await async_api.list_upcoming_events(max_results=5)
         if not events:
             print("Agent: No upcoming events found.")
             return
 
         print("Agent: Here are your upcoming events:")
-        for idx, event in enumerate(events, 1):
-            time_str = format_event_time(event)
-            print(f"{idx}. {event['summary']} - {time_str}")
+        print_events(events)
+
+        remember("list events", "Listed upcoming events successfully")
+
+    except Exception as e:
+        error_msg = f"Failed to list events: {str(e)}"
+        print(f"Agent: {error_msg}")
+        remember("list events", error_msg)
+
+
+async def handle_agenda(user_input: str) -> None:
+    """Handle the merged agenda across all calendars, printed as it streams in."""
+    from calendar_integration import format_event_time
+    try:
+        # Format: agenda or agenda|days
+        parts = user_input.split("|")
+        days = int(parts[1]) if len(parts) > 1 and parts[1].strip() else 7
+
+        now = datetime.now(config.LOCAL_TIMEZONE)
+        count = 0
+        async for event in async_api.iter_agenda(now, now + timedelta(days=days)):
+            if count == 0:
+                print(f"Agent: Here is your agenda for the next {days} day(s):")
+            count += 1
+            print(f"{count}. {event.get('summary', '(busy)')} - {format_event_time(event)} [{event['calendar']}]")
             if event.get('location'):
                 print(f"   Location: {event['location']}")
 
-        update_memory("list events", "Listed upcoming events successfully")
+        result = f"Listed {count} event(s) across all calendars for the next {days} day(s)"
+        if count == 0:
+            print("Agent: No events found on any calendar.")
+        remember(user_input, result)
+    except Exception as e:
+        error_msg = f"Failed to build agenda: {str(e)}"
+        print(f"Agent: {error_msg}")
+        remember(user_input, error_msg)
+
+
+async def handle_calendar_free(user_input: str) -> None:
+    """Handle checking whether a time is free."""
+    from calendar_integration import parse_date_time
+    try:
+        # Format: free|YYYY-MM-DD|HH:MM|[minutes]
+        parts = user_input.split("|")
+        if len(parts) < 3:
+            print("Agent: Please use format: free|YYYY-MM-DD|HH:MM|[minutes]")
+            return
+
+        _, date_str, time_str, *extras = parts
+        minutes = int(extras[0]) if extras and extras[0].strip() else 60
+        start_time = parse_date_time(date_str.strip(), time_str.strip())
+        end_time = start_time + timedelta(minutes=minutes)
+
+        if await async_api.is_free(start_time, end_time):
+            result = f"You are free on {date_str.strip()} at {time_str.strip()} for {minutes} minutes."
+        else:
+            result = f"You are busy on {date_str.strip()} at {time_str.strip()}."
+        print(f"Agent: {result}")
+        remember(user_input, result)
 
     except Exception as e:
-        error_msg = f"Failed to list events: {str(e)}"
+        error_msg = f"Failed to check availability: {str(e)}"
+        print(f"Agent: {error_msg}")
+        remember(user_input, error_msg)
+
+
+async def handle_calendar_find_slot(user_input: str) -> None:
+    """Handle searching for free slots."""
+    from calendar_integration import parse_date_time
+    try:
+        # Format: find slot|YYYY-MM-DD|YYYY-MM-DD|[minutes]
+        parts = user_input.split("|")
+        if len(parts) < 3:
+            print("Agent: Please use format: find slot|YYYY-MM-DD|YYYY-MM-DD|[minutes]")
+            return
+
+        _, start_date, end_date, *extras = parts
+        minutes = int(extras[0]) if extras and extras[0].strip() else 60
+        range_start = max(
+            parse_date_time(start_date.strip(), "00:00"),
+            datetime.now(config.LOCAL_TIMEZONE)
+        )
+        range_end = parse_date_time(end_date.strip(), "23:59")
+
+        slots = await async_api.find_free_time(range_start, range_end, minutes)
+        if not slots:
+            result = "No free slots found in that range."
+            print(f"Agent: {result}")
+        else:
+            result = f"Found {len(slots)} free slot(s)"
+            print(f"Agent: Here are free {minutes}-minute slots:")
+            for idx, (slot_start, slot_end) in enumerate(slots, 1):
+                print(f"{idx}. {slot_start.strftime('%Y-%m-%d %I:%M %p')} to {slot_end.strftime('%I:%M %p')}")
+        remember(user_input, result)
+
+    except Exception as e:
+        error_msg = f"Failed to find free slots: {str(e)}"
+        print(f"Agent: {error_msg}")
+        remember(user_input, error_msg)
+
+
+async def handle_calendar_import(user_input: str) -> None:
+    """Handle bulk importing events from an ICS or CSV file."""
+    try:
+        # Format: import events|path/to/file.ics
+        parts = user_input.split("|")
+        if len(parts) != 2 or not parts[1].strip():
+            print("Agent: Please use format: import events|path/to/file.ics (or .csv)")
+            return
+
+        report = await async_api.import_events(parts[1].strip())
+        result = (
+            f"Imported {report['created']} event(s), {report['exists']} already present, "
+            f"{report['failed']} failed ({report['events_per_second']:.1f} events/s)."
+        )
+        print(f"Agent: {result}")
+        for item in report['results']:
+            if item['status'] == 'failed':
+                print(f"   Failed: {item['summary'] or '(no title)'} - {item['detail']}")
+        remember(user_input, result)
+
+    except Exception as e:
+        error_msg = f"Failed to import events: {str(e)}"
         print(f"Agent: {error_msg}")
-        update_memory("list events", error_msg)
+        remember(user_input, error_msg)
 
 
-def process_user_input(user_input: str, context: Optional[str] = None) -> None:
-    """Process user input and execute appropriate command."""
+async def handle_briefing() -> None:
+    """Handle the combined inbox and agenda briefing."""
+    try:
+        emails, events = await async_api.briefing()
+
+        print("Agent: Here is your briefing.")
+        print("\nRecent emails:")
+        if emails:
+            print_emails(emails)
+        else:
+            print("No emails found.")
+        print("\nUpcoming events:")
+        if events:
+            print_events(events)
+        else:
+            print("No upcoming events found.")
+
+        remember("briefing", "Gave inbox and agenda briefing")
+    except Exception as e:
+        error_msg = f"Failed to prepare briefing: {str(e)}"
+        print(f"Agent: {error_msg}")
+        remember("briefing", error_msg)
+
+
+async def handle_triage(user_input: str) -> None:
+    """Handle the prioritized inbox digest."""
+    import triage
+    try:
+        # Format: triage or triage|N
+        parts = user_input.split("|")
+        max_results = int(parts[1]) if len(parts) > 1 and parts[1].strip() else 30
+
+        digest = await triage.triage_inbox(max_results)
+        print("Agent: Here is your inbox by priority.")
+        for priority in triage.PRIORITIES:
+            if not digest[priority]:
+                continue
+            print(f"\n{priority.capitalize()} priority:")
+            for idx, item in enumerate(digest[priority], 1):
+                print(f"{idx}. {item['subject']} - {item['sender']}")
+                print(f"   {item['summary']}")
+        if digest['action_items']:
+            print("\nAction items:")
+            for action, item in digest['action_items']:
+                print(f"- {action} ({item['subject']})")
+
+        result = (
+            f"Triaged {sum(len(digest[p]) for p in triage.PRIORITIES)} email(s): "
+            f"{len(digest['high'])} high priority, {len(digest['action_items'])} action item(s)"
+        )
+        print(f"\n({digest['summarized']} newly summarized, {digest['cached']} from cache)")
+        remember(user_input, result)
+    except Exception as e:
+        error_msg = f"Failed to triage inbox: {str(e)}"
+        print(f"Agent: {error_msg}")
+        remember(user_input, error_msg)
+
+
+def _localize(naive: datetime) -> datetime:
+    return config.LOCAL_TIMEZONE.localize(naive)
+
+
+async def handle_intent(intent, user_input: str) -> None:
+    """
+    Answer a request the local intent router recognized, without the LLM.
+    
+    Args:
+        intent: intent_router.Intent with resolved slots (naive local times)
+        user_input: Raw user input, stored in memory with the result
+    """
+    slots = intent.slots
+    try:
+        if intent.name == 'list_emails':
+            await handle_email_list(slots['max_results'])
+            return
+
+        if intent.name == 'search_emails':
+            emails = await async_api.search_emails(slots['query'])
+            if not emails:
+                result = f"No emails match {slots['query']}."
+                print(f"Agent: {result}")
+            else:
+                result = f"Found {len(emails)} email(s) matching {slots['query']}"
+                print(f"Agent: Here are emails matching {slots['query']}:")
+                print_emails(emails)
+
+        elif intent.name == 'list_events':
+            events = await async_api.list_events_between(
+                _localize(slots['start']), _localize(slots['end'])
+            )
+            if not events:
+                result = f"No events {slots['when']}."
+                print(f"Agent: {result}")
+            else:
+                result = f"Listed {len(events)} event(s) {slots['when']}"
+                print(f"Agent: Here are your events {slots['when']}:")
+                print_events(events)
+
+        elif intent.name == 'is_free':
+            start = slots['start']
+            when = start.strftime('%a %Y-%m-%d at %I:%M %p')
+            if await async_api.is_free(_localize(start), _localize(slots['end'])):
+                result = f"You are free on {when} for {slots['minutes']} minutes."
+            else:
+                result = f"You are busy on {when}."
+            print(f"Agent: {result}")
+
+        elif intent.name == 'find_slot':
+            slots_found = await async_api.find_free_time(
+                _localize(slots['start']), _localize(slots['end']), slots['minutes']
+            )
+            if not slots_found:
+                result = "No free slots found in that range."
+                print(f"Agent: {result}")
+            else:
+                result = f"Found {len(slots_found)} free slot(s)"
+                print(f"Agent: Here are free {slots['minutes']}-minute slots:")
+                for idx, (slot_start, slot_end) in enumerate(slots_found, 1):
+                    print(f"{idx}. {slot_start.strftime('%Y-%m-%d %I:%M %p')} to {slot_end.strftime('%I:%M %p')}")
+
+        else:
+            raise ValueError(f"Unhandled intent {intent.name}")
+        remember(user_input, result)
+
+    except Exception as e:
+        error_msg = f"Failed to answer request: {str(e)}"
+        print(f"Agent: {error_msg}")
+        remember(user_input, error_msg)
+
+
+def _ms(seconds: Optional[float]) -> str:
+    return f"{seconds * 1000:.1f}" if seconds is not None else "-"
+
+
+def handle_stats(user_input: str) -> None:
+    """Print latency histograms and usage, or export them to a file."""
+    # Format: stats or stats|metrics.prom or stats|metrics.jsonl
+    parts = user_input.split("|")
+    if len(parts) == 2 and parts[1].strip():
+        path = parts[1].strip()
+        try:
+            if path.endswith(".jsonl"):
+                metrics.export_jsonl(path)
+            else:
+                with open(path, "w") as f:
+                    f.write(metrics.export_prometheus())
+            print(f"Agent: Metrics written to {path}")
+        except OSError as e:
+            print(f"Agent: Failed to export metrics: {str(e)}")
+        return
+
+    rows = metrics.summary()
+    if not rows:
+        print("Agent: No operations recorded yet.")
+    else:
+        print("Agent: Operation latency (ms):")
+        print(f"   {'operation':<48} {'count':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for row in rows:
+            label = ",".join(f"{k}={v}" for k, v in row['labels'].items())
+            name = f"{row['name']}[{label}]" if label else row['name']
+            print(
+                f"   {name[:48]:<48} {row['count']:>6} {_ms(row['mean']):>8} "
+                f"{_ms(row['p50']):>8} {_ms(row['p95']):>8} {_ms(row['p99']):>8}"
+            )
+
+    for name, value in sorted(metrics.counters().items()):
+        print(f"   {name}: {value:g}")
+
+    # Only report on modules this session has actually loaded
+    agent = sys.modules.get('agent')
+    if agent is not None and agent.call_metrics:
+        last = agent.call_metrics[-1]
+        print(
+            f"   Last chat call: first token {_ms(last.time_to_first_token)} ms, "
+            f"total {_ms(last.total_latency)} ms, "
+            f"tokens {last.prompt_tokens or '-'} in / {last.completion_tokens or '-'} out"
+        )
+    if agent is not None and agent.response_cache is not None:
+        cache = agent.response_cache.stats()
+        print(
+            f"   Response cache: {cache['hits']} hits, {cache['misses']} misses "
+            f"({cache['hit_rate']:.0%}), {cache['entries']} entries"
+        )
+    rate_limiter = sys.modules.get('rate_limiter')
+    if rate_limiter is not None:
+        scheduler = rate_limiter.get_scheduler().stats
+        print(
+            f"   Google API calls: {scheduler['calls']}, retries: {scheduler['retries']}, "
+            f"throttled: {scheduler['throttled']}, "
+            f"pacing wait: {scheduler['wait_seconds']:.2f}s"
+        )
+    intent_router = sys.modules.get('intent_router')
+    if intent_router is not None:
+        router = intent_router.stats
+        routed = sum(router.routed.values())
+        print(
+            f"   Local intent router: {routed} answered locally, "
+            f"{router.fallbacks} sent to the model ({router.hit_rate:.0%} hit rate)"
+        )
+
+
+async def load_context(user_input: str) -> str:
+    """Build conversation context for the model, or none if that fails."""
+    try:
+        return await async_api.build_context(user_input)
+    except Exception as e:
+        logging.error("Failed to build context: %s", str(e))
+        return ""
+
+
+async def process_user_input(user_input: str, context: Optional[str] = None) -> None:
+    """
+    Process user input and execute appropriate command.
+    
+    Context is only built (unless given) when the request goes to the
+    model; commands and locally routed intents never use it.
+    """
     # Convert input to lowercase for command matching
     input_lower = user_input.lower()
     
     # Handle email listing commands
     if any(cmd in input_lower for cmd in ['list email', 'show email', 'get email']):
-        handle_email_list()
+        await handle_email_list()
         return
         
     # Handle other commands
     if input_lower.startswith("send email"):
-        handle_email_send(user_input)
+        await handle_email_send(user_input)
+    elif input_lower.startswith("mail merge"):
+        await handle_mail_merge(user_input)
     elif input_lower.startswith("add event"):
-        handle_calendar_add(user_input)
+        await handle_calendar_add(user_input)
+    elif input_lower.startswith("delete event"):
+        await handle_calendar_delete(user_input)
+    elif input_lower.startswith("jobs"):
+        await handle_jobs()
+    elif input_lower.startswith("agenda"):
+        await handle_agenda(user_input)
     elif input_lower.startswith("list events"):
-        handle_calendar_list()
+        await handle_calendar_list()
+    elif input_lower.startswith("free|"):
+        await handle_calendar_free(user_input)
+    elif input_lower.startswith("find slot"):
+        await handle_calendar_find_slot(user_input)
+    elif input_lower.startswith("import events"):
+        await handle_calendar_import(user_input)
+    elif input_lower.startswith("briefing"):
+        await handle_briefing()
+    elif input_lower.startswith("triage"):
+        await handle_triage(user_input)
+    elif input_lower.startswith("stats"):
+        handle_stats(user_input)
     else:
-        response = run_agent(user_input, context)
-        print("Agent:", response)
-        update_memory(user_input, response)
+        import intent_router
 
+        # Routine requests ("emails from alice", "am I free tomorrow at 3pm")
+        # are parsed locally; anything ambiguous goes to the model
+        now = datetime.now(config.LOCAL_TIMEZONE).replace(tzinfo=None)
+        intent = intent_router.route(user_input, now)
+        if intent is not None:
+            await handle_intent(intent, user_input)
+            return
 
-def main() -> None:
-    """Main loop for the personal assistant."""
+        from agent import stream_agent_with_tools
+
+        if context is None:
+            context = await load_context(user_input)
+
+        # Render tokens as they arrive and keep the full text for memory;
+        # tool calls requested by the model run concurrently in between
+        print("Agent: ", end="", flush=True)
+        chunks = []
+        async for chunk in stream_agent_with_tools(user_input, context):
+            print(chunk, end="", flush=True)
+            chunks.append(chunk)
+        print()
+        remember(user_input, "".join(chunks))
+
+
+def read_input(prompt: str) -> "asyncio.Future[str]":
+    """
+    Read a line on a daemon thread so the event loop keeps running.
+    
+    A daemon thread (rather than an executor) lets the process exit
+    while a read is still blocked.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def reader() -> None:
+        try:
+            line = input(prompt)
+        except Exception as e:
+            loop.call_soon_threadsafe(future.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(future.set_result, line)
+
+    threading.Thread(target=reader, daemon=True).start()
+    return future
+
+
+async def repl() -> None:
+    """Async read-eval-print loop for the personal assistant."""
     print("Personal Agent initialized. Type 'exit' to quit.")
     print("Available commands:")
     print("- list emails")
     print("- send email|to@example.com|Subject|Message")
+    print("- mail merge|template.txt|recipients.csv")
     print("- list events")
+    print("- agenda|[days]")
     print("- add event|Summary|YYYY-MM-DD|HH:MM")
-    
-    while True:
-        try:
-            user_input = input("You: ").strip()
-            if user_input.lower() == 'exit':
-                print("Goodbye!")
+    print("- delete event|EVENT_ID")
+    print("- jobs")
+    print("- free|YYYY-MM-DD|HH:MM|[minutes]")
+    print("- find slot|YYYY-MM-DD|YYYY-MM-DD|[minutes]")
+    print("- import events|path/to/file.ics (or .csv)")
+    print("- briefing")
+    print("- triage|[number of emails]")
+    print("- stats|[metrics.prom or metrics.jsonl]")
+
+    import outbox
+    if os.path.exists(outbox.OUTBOX_FILE):
+        # Resume jobs left queued by an earlier session
+        outbox.get_outbox().start()
+
+    try:
+        while True:
+            try:
+                user_input = (await read_input("You: ")).strip()
+                if user_input.lower() == 'exit':
+                    print("Goodbye!")
+                    break
+
+                await process_user_input(user_input)
+
+            except EOFError:
+                print("\nGoodbye!")
                 break
-                
-            context = retrieve_context()
-            process_user_input(user_input, context)
+            except Exception as e:
+                print(f"An error occurred: {str(e)}")
+                logging.error("Error in main loop: %s", str(e))
+    finally:
+        await flush_memory()
+        outbox = sys.modules.get('outbox')
+        if outbox is not None and outbox.get_outbox().started:
+            # Give in-flight sends a moment; anything left resumes next start
+            await async_api.run_blocking(outbox.get_outbox().wait_idle, 10.0)
 
-        except KeyboardInterrupt:
-            print("\nGoodbye!")
-            break
-        except Exception as e:
-            print(f"An error occurred: {str(e)}")
-            logging.error("Error in main loop: %s", str(e))
+
+def main() -> None:
+    """Main entry point for the personal assistant."""
+    # Configured here as well as in agent so errors logged before the
+    # first chat request (which loads agent) still reach error.log
+    logging.basicConfig(
+        filename='error.log',
+        level=logging.ERROR,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    try:
+        asyncio.run(repl())
+    except KeyboardInterrupt:
+        print("\nGoodbye!")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
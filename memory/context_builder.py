@@ -0,0 +1,214 @@
+"""Relevance-ranked, token-budgeted conversation context assembly."""
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import metrics
+from config import CONTEXT_TOKEN_BUDGET
+from memory.memory import get_search_index
+
+# Define constants
+SUMMARY_FILE = "memory/summary.json"
+HISTORY_WINDOW = 200     # Newest messages ranked against the input
+RECENT_TURNS = 2         # Newest turns always kept when they fit
+SUMMARY_BATCH = 20       # Aged-out messages collected before re-summarizing
+SUMMARY_CHUNK = 200      # Messages folded into the summary per refresh
+MAX_SUMMARY_CHARS = 500  # Per-message truncation in the summary transcript
+RECENCY_WEIGHT = 0.5
+BM25_K1 = 1.5
+BM25_B = 0.75
+CHARS_PER_TOKEN = 4      # Estimate used when the tokenizer cannot load
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Token counts and term frequencies per turn, keyed by its first message ID
+_turn_stats: Dict[int, Tuple[int, Counter]] = {}
+_encoding = None
+_summary: Optional[Dict] = None
+_summary_lock = threading.Lock()
+_summarizing = False
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word terms for relevance scoring."""
+    return _WORD_PATTERN.findall(text.lower())
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count prompt tokens in text with the model's tokenizer.
+    
+    tiktoken downloads its encoding on first use; when that fails (e.g.
+    offline) tokens are estimated at CHARS_PER_TOKEN characters each.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            from agent import MODEL
+            _encoding = tiktoken.encoding_for_model(MODEL)
+        except Exception as e:
+            logging.error("Tokenizer unavailable, estimating token counts: %s", str(e))
+            _encoding = False
+    if _encoding is False:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(_encoding.encode(text))
+
+
+def bm25_scores(query: str, term_counts: List[Counter], lengths: np.ndarray) -> np.ndarray:
+    """
+    Score documents against a query with Okapi BM25.
+    
+    Args:
+        query: Text to rank against
+        term_counts: Term frequencies for each document
+        lengths: Length in terms of each document
+    
+    Returns:
+        np.ndarray: One score per document, higher is more relevant
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms or not term_counts:
+        return np.zeros(len(term_counts))
+
+    tf = np.array(
+        [[counts.get(term, 0) for term in terms] for counts in term_counts],
+        dtype=float
+    )
+    n_docs = len(term_counts)
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+    avgdl = lengths.mean() or 1.0
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avgdl)
+    return (idf * tf * (BM25_K1 + 1) / (tf + norm[:, None])).sum(axis=1)
+
+
+def _group_turns(messages: List[Dict]) -> List[Tuple[int, str]]:
+    """Group messages into (first message ID, text) turns, oldest first."""
+    turns: List[Tuple[int, List[str]]] = []
+    for message in messages:
+        line = f"{message['role']}: {message['content']}"
+        if message['role'] == 'user' or not turns:
+            turns.append((message['id'], [line]))
+        else:
+            turns[-1][1].append(line)
+    return [(turn_id, "\n".join(lines)) for turn_id, lines in turns]
+
+
+def _stats(turn_id: int, text: str) -> Tuple[int, Counter]:
+    stats = _turn_stats.get(turn_id)
+    if stats is None:
+        stats = (count_tokens(text), Counter(tokenize(text)))
+        _turn_stats[turn_id] = stats
+    return stats
+
+
+def _load_summary() -> Dict:
+    """Return the cached rolling summary, reading it from disk once."""
+    global _summary
+    with _summary_lock:
+        if _summary is None:
+            try:
+                with open(SUMMARY_FILE, "r") as f:
+                    _summary = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                _summary = {"through_id": 0, "summary": ""}
+        return _summary
+
+
+def _refresh_summary(before_id: int) -> None:
+    """Fold messages that left the ranking window into the summary."""
+    global _summary, _summarizing
+    from agent import summarize_history
+    try:
+        current = _load_summary()
+        messages = get_search_index().between(current["through_id"], before_id)
+        messages = messages[:SUMMARY_CHUNK]
+        if not messages:
+            return
+        transcript = "\n".join(
+            f"{m['role']}: {m['content'][:MAX_SUMMARY_CHARS]}" for m in messages
+        )
+        updated = {
+            "through_id": messages[-1]["id"],
+            "summary": summarize_history(current["summary"], transcript)
+        }
+        tmp_path = f"{SUMMARY_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(updated, f)
+        os.replace(tmp_path, SUMMARY_FILE)
+        with _summary_lock:
+            _summary = updated
+    except Exception as e:
+        logging.error("Failed to refresh conversation summary: %s", str(e))
+    finally:
+        _summarizing = False
+
+
+def _maybe_refresh_summary(window_start_id: int) -> None:
+    """Start a background summary refresh once enough history has aged out."""
+    global _summarizing
+    if _summarizing:
+        return
+    if window_start_id - _load_summary()["through_id"] - 1 < SUMMARY_BATCH:
+        return
+    _summarizing = True
+    threading.Thread(
+        target=_refresh_summary, args=(window_start_id,), daemon=True
+    ).start()
+
+
+@metrics.timed('memory.build_context')
+def build_context(user_input: str, token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Assemble the conversation context most relevant to user_input.
+    
+    Recent history is ranked with BM25 plus a recency bonus and the best
+    turns that fit token_budget are kept in chronological order. Older
+    history is represented by a cached rolling summary.
+    
+    Args:
+        user_input: The current user request
+        token_budget: Maximum tokens to spend on context
+    
+    Returns:
+        str: Formatted conversation context
+    """
+    messages = get_search_index().recent(HISTORY_WINDOW)
+    if not messages:
+        return ""
+    _maybe_refresh_summary(messages[0]["id"])
+
+    summary = _load_summary()["summary"]
+    header = f"Summary of earlier conversation: {summary}" if summary else ""
+    remaining = token_budget - (count_tokens(header) if header else 0)
+
+    turns = _group_turns(messages)
+    stats = [_stats(turn_id, text) for turn_id, text in turns]
+    if len(_turn_stats) > 2 * HISTORY_WINDOW:
+        live = {turn_id for turn_id, _ in turns}
+        for turn_id in list(_turn_stats):
+            if turn_id not in live:
+                del _turn_stats[turn_id]
+    lengths = np.array([sum(counts.values()) for _, counts in stats], dtype=float)
+    scores = bm25_scores(user_input, [counts for _, counts in stats], lengths)
+    scores += np.linspace(0.0, RECENCY_WEIGHT, len(turns))
+    scores[-RECENT_TURNS:] = np.inf
+
+    chosen = []
+    for i in np.argsort(-scores, kind="stable"):
+        tokens = stats[i][0]
+        if tokens <= remaining:
+            chosen.append(i)
+            remaining -= tokens
+
+    parts = [header] if header else []
+    parts.extend(turns[i][1] for i in sorted(chosen))
+    return "\n".join(parts)
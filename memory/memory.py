@@ -2,36 +2,141 @@
 
 import json
 import os
-from typing import List, Dict, Optional
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Dict, Optional
+
+import metrics
+from memory.search_index import SearchIndex
 
 # Define constants
-MEMORY_FILE = "memory/chat.json"
+MEMORY_FILE = "memory/chat.jsonl"
+LEGACY_MEMORY_FILE = "memory/chat.json"
 MAX_MEMORY = 10
+COMPACT_THRESHOLD = 1000  # Log lines kept before compacting in the background
+
+# The last MAX_MEMORY messages, loaded from the log once per process
+_recent: Deque[Dict] = deque(maxlen=MAX_MEMORY)
+_loaded = False
+_log_lines = 0
+_compacting = False
+_lock = threading.Lock()
+
+# Complete history lives in the full-text index; the log only holds recent turns
+_index = SearchIndex()
+
+
+def _fsync_directory(path: str) -> None:
+    """Make a rename in path durable (no-op where unsupported)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_atomic(path: str, records: List[Dict]) -> None:
+    """Replace path with records as JSON lines via a temp file and rename."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.writelines(json.dumps(r) + "\n" for r in records)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(os.path.dirname(path) or ".")
+
+
+def _read_log() -> List[Dict]:
+    """
+    Read all intact records from the log.
+    
+    A torn final line left by a crash is truncated away so later appends
+    start on a clean line; any other unparsable line is skipped.
+    """
+    with open(MEMORY_FILE, "rb") as f:
+        data = f.read()
+
+    end = data.rfind(b"\n") + 1
+    if end < len(data):
+        with open(MEMORY_FILE, "r+b") as f:
+            f.truncate(end)
+
+    records = []
+    for line in data[:end].splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
 
-# Ensure memory directory exists
-os.makedirs(os.path.dirname(MEMORY_FILE), exist_ok=True)
+def _load() -> None:
+    """Populate the ring buffer from disk on first use. Caller holds _lock."""
+    global _loaded, _log_lines
+    if _loaded:
+        return
+
+    if os.path.exists(MEMORY_FILE):
+        records = _read_log()
+    elif os.path.exists(LEGACY_MEMORY_FILE):
+        # One-time migration from the old whole-file JSON store
+        try:
+            with open(LEGACY_MEMORY_FILE, "r") as f:
+                records = json.load(f)
+        except json.JSONDecodeError:
+            records = []
+        _write_atomic(MEMORY_FILE, records)
+    else:
+        records = []
+
+    if _index.is_empty() and records:
+        _index.add(records)
+
+    _recent.extend(records)
+    _log_lines = len(records)
+    _loaded = True
+
+
+def _compact() -> None:
+    """Rewrite the log to hold only the buffered messages."""
+    global _log_lines, _compacting
+    try:
+        with _lock:
+            _write_atomic(MEMORY_FILE, list(_recent))
+            _log_lines = len(_recent)
+    finally:
+        _compacting = False
 
 
+def get_search_index() -> SearchIndex:
+    """Return the full-history index, backfilled from the log if needed."""
+    with _lock:
+        _load()
+    return _index
+
+
+@metrics.timed('memory.retrieve_context')
 def retrieve_context() -> str:
     """
-    Retrieve conversation context from memory file.
+    Retrieve conversation context from memory.
     
     Returns:
         str: Formatted conversation history
     """
-    if not os.path.exists(MEMORY_FILE):
-        return ""
-
-    try:
-        with open(MEMORY_FILE, "r") as f:
-            data = json.load(f)
-            return "\n".join(
-                f"{m['role']}: {m['content']}" for m in data
-            )
-    except json.JSONDecodeError:
-        return ""
+    with _lock:
+        _load()
+        return "\n".join(
+            f"{m['role']}: {m['content']}" for m in _recent
+        )
 
 
+@metrics.timed('memory.update_memory')
 def update_memory(user: str, agent: str) -> None:
     """
     Update conversation memory with new interactions.
@@ -40,42 +145,52 @@ def update_memory(user: str, agent: str) -> None:
         user: User's input message
         agent: Agent's response message
     """
-    chat = []
-    
-    if os.path.exists(MEMORY_FILE):
-        try:
-            with open(MEMORY_FILE, "r") as f:
-                chat = json.load(f)
-        except json.JSONDecodeError:
-            chat = []
+    global _log_lines, _compacting
+    now = time.time()
+    records = [
+        {"role": "user", "content": user, "ts": now},
+        {"role": "assistant", "content": agent, "ts": now}
+    ]
 
-    # Add new messages
-    chat.extend([
-        {"role": "user", "content": user},
-        {"role": "assistant", "content": agent}
-    ])
+    with _lock:
+        _load()
+        # Created on first write rather than at import
+        os.makedirs(os.path.dirname(MEMORY_FILE), exist_ok=True)
+        # One write of complete lines; a crash can only tear the final line
+        with open(MEMORY_FILE, "a") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records))
+            f.flush()
+            os.fsync(f.fileno())
+        _recent.extend(records)
+        _log_lines += len(records)
+        _index.add(records)
 
-    # Keep only the most recent messages
-    with open(MEMORY_FILE, "w") as f:
-        json.dump(chat[-MAX_MEMORY:], f, indent=2)
+        if _log_lines >= COMPACT_THRESHOLD and not _compacting:
+            _compacting = True
+            threading.Thread(target=_compact, daemon=True).start()
 
 
-def search_memory(query: str) -> List[Dict[str, str]]:
+@metrics.timed('memory.search_memory')
+def search_memory(
+    query: str,
+    limit: int = 20,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    prefix: bool = False
+) -> List[Dict[str, str]]:
     """
-    Search conversation history for specific content.
+    Search the complete conversation history for specific content.
     
     Args:
-        query: Search term to look for in messages
+        query: Search terms; a word ending in '*' matches as a prefix
+        limit: Maximum number of messages to return
+        since: Only include messages at or after this epoch time
+        until: Only include messages before this epoch time
+        prefix: Treat every search word as a prefix
     
     Returns:
-        List[Dict[str, str]]: Matching messages
+        List[Dict[str, str]]: Matching messages, most relevant first
     """
-    try:
-        with open(MEMORY_FILE, "r") as f:
-            chat = json.load(f)
-            return [
-                m for m in chat
-                if query.lower() in m['content'].lower()
-            ]
-    except (json.JSONDecodeError, FileNotFoundError):
-        return []
\ No newline at end of file
+    with _lock:
+        _load()
+    return _index.search(query, limit=limit, since=since, until=until, prefix=prefix)
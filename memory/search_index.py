@@ -0,0 +1,164 @@
+"""Full-text index over the complete conversation history."""
+
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+# Define constants
+INDEX_FILE = "memory/history.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_ts ON messages (ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content,
+    content='messages',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content)
+    VALUES ('delete', old.id, old.content);
+END;
+"""
+
+_TERM_PATTERN = re.compile(r"\w+\*?")
+
+
+def build_match_query(query: str, prefix: bool = False) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+    
+    Every word becomes a quoted term so FTS5 operators in user text are
+    treated literally. A trailing '*' on a word (or prefix=True for all
+    words) makes it a prefix query.
+    
+    Args:
+        query: Raw search text
+        prefix: Treat every word as a prefix
+    
+    Returns:
+        str: MATCH expression, empty if the query has no words
+    """
+    terms = []
+    for word in _TERM_PATTERN.findall(query):
+        star = word.endswith("*") or prefix
+        terms.append(f'"{word.rstrip("*")}"' + ("*" if star else ""))
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """SQLite FTS5 index of every stored message, ranked with BM25."""
+
+    def __init__(self, path: str = INDEX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def is_empty(self) -> bool:
+        """Return True if no messages have been indexed."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT 1 FROM messages LIMIT 1"
+            ).fetchone()
+        return row is None
+
+    def add(self, records: Iterable[Dict]) -> None:
+        """
+        Index messages.
+        
+        Args:
+            records: Dicts with role, content and ts (epoch seconds)
+        """
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO messages (role, content, ts) VALUES (?, ?, ?)",
+                [(r['role'], r['content'], r.get('ts', 0.0)) for r in records]
+            )
+
+    def recent(self, limit: int) -> List[Dict]:
+        """Return the newest messages with their row IDs, oldest first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, role, content, ts FROM messages ORDER BY id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def between(self, after_id: int, before_id: int) -> List[Dict]:
+        """Return messages with after_id < id < before_id, oldest first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, role, content, ts FROM messages "
+                "WHERE id > ? AND id < ? ORDER BY id",
+                (after_id, before_id)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        prefix: bool = False
+    ) -> List[Dict]:
+        """
+        Return the best matching messages, most relevant first.
+        
+        Args:
+            query: Search text; words ending in '*' match as prefixes
+            limit: Maximum number of results
+            since: Only include messages at or after this epoch time
+            until: Only include messages before this epoch time
+            prefix: Treat every word as a prefix
+        
+        Returns:
+            List[Dict]: Messages with role, content, ts and BM25 score
+            (lower is better)
+        """
+        match = build_match_query(query, prefix)
+        if not match:
+            return []
+
+        sql = (
+            "SELECT m.role, m.content, m.ts, bm25(messages_fts) AS score "
+            "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+            "WHERE messages_fts MATCH ?"
+        )
+        params: List = [match]
+        if since is not None:
+            sql += " AND m.ts >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND m.ts < ?"
+            params.append(until)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,231 @@
+"""Lightweight in-process spans, counters and latency histograms."""
+
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds (Prometheus defaults)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+MAX_SPANS = 1000
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_histograms: Dict[Tuple[str, Labels], 'Histogram'] = {}
+_counters: Dict[Tuple[str, Labels], float] = {}
+
+# Most recent finished spans, oldest first
+spans: Deque[Dict] = deque(maxlen=MAX_SPANS)
+
+# Innermost open span of the current thread or task
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    'current_span', default=None
+)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram."""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile by interpolating within its bucket.
+        
+        Returns:
+            Optional[float]: Seconds, or None when nothing was observed
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(BUCKETS, self.counts):
+            if seen + count >= rank and count:
+                if bound == float('inf'):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound if bound != float('inf') else lower
+        return lower
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """Record a duration in the histogram for name and labels."""
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    """Add value to a counter."""
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+@contextmanager
+def span(name: str, **labels) -> Iterator[None]:
+    """
+    Time a block as an operation called name.
+    
+    The duration lands in the name histogram, failures also increment
+    '<name>_errors', and the finished span (with its parent, if it ran
+    inside another span) is kept in spans.
+    """
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        _current_span.reset(token)
+        observe(name, duration, **labels)
+        if error:
+            inc(f"{name}_errors", **labels)
+        spans.append({
+            'name': name,
+            'labels': dict(_labels(labels)),
+            'parent': parent,
+            'start': time.time() - duration,
+            'duration': duration,
+            'error': error,
+        })
+
+
+def timed(name: str, **labels):
+    """Decorator form of span for plain and async functions."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summary() -> List[Dict]:
+    """
+    Return per-operation latency statistics, slowest total time first.
+    
+    Returns:
+        List[Dict]: name, labels, count, mean, p50, p95, p99 (seconds)
+    """
+    with _lock:
+        items = [
+            (name, labels, histogram.count, histogram.sum,
+             [histogram.quantile(q) for q in (0.5, 0.95, 0.99)])
+            for (name, labels), histogram in _histograms.items()
+        ]
+    rows = [
+        {
+            'name': name,
+            'labels': dict(labels),
+            'count': count,
+            'total': total,
+            'mean': total / count if count else None,
+            'p50': p50,
+            'p95': p95,
+            'p99': p99,
+        }
+        for name, labels, count, total, (p50, p95, p99) in items
+    ]
+    return sorted(rows, key=lambda row: row['total'], reverse=True)
+
+
+def counters() -> Dict[str, float]:
+    """Return counter values keyed by name{labels}."""
+    with _lock:
+        return {_series(name, labels): value for (name, labels), value in _counters.items()}
+
+
+def _series(name: str, labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+def _metric_name(name: str) -> str:
+    return "agent_" + name.replace(".", "_").replace("-", "_")
+
+
+def export_prometheus() -> str:
+    """Render all histograms and counters in the Prometheus text format."""
+    lines: List[str] = []
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counter_items = sorted(_counters.items())
+
+    emitted = set()
+    for (name, labels), histogram in histograms:
+        metric = _metric_name(name) + "_seconds"
+        if metric not in emitted:
+            lines.append(f"# TYPE {metric} histogram")
+            emitted.add(metric)
+        cumulative = 0
+        for bound, count in zip(BUCKETS, histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float('inf') else repr(bound)
+            lines.append(f"{_series(metric + '_bucket', labels, (('le', le),))} {cumulative}")
+        lines.append(f"{_series(metric + '_sum', labels)} {histogram.sum}")
+        lines.append(f"{_series(metric + '_count', labels)} {histogram.count}")
+
+    for (name, labels), value in counter_items:
+        metric = _metric_name(name) + "_total"
+        if metric not in emitted:
+            lines.append(f"# TYPE {metric} counter")
+            emitted.add(metric)
+        lines.append(f"{_series(metric, labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def export_jsonl(path: str) -> None:
+    """Append one JSON line with a snapshot of every metric to path."""
+    record = {'ts': time.time(), 'operations': summary(), 'counters': counters()}
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def reset() -> None:
+    """Forget all recorded metrics and spans."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+    spans.clear()
@@ -0,0 +1,359 @@
+"""Durable SQLite outbox for sends and calendar writes, drained in the background."""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Define constants
+OUTBOX_FILE = "cache/outbox.db"
+MAX_ATTEMPTS = 6
+RETRY_BASE = 2.0     # Seconds
+RETRY_CAP = 300.0    # Seconds
+# An identical job enqueued within this many seconds of one that is still
+# queued or running shares it; finished jobs are never matched
+DEDUP_WINDOW = 600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_attempt);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, created_at);
+"""
+
+# Job states; 'running' jobs found at startup were interrupted mid-call
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class RetryableError(Exception):
+    """A job failed in a way that is safe and worth retrying."""
+
+
+def _send_email(payload: Dict) -> str:
+    from googleapiclient.errors import HttpError
+    from gmail_integration import send_email
+    from rate_limiter import is_rate_limited
+    try:
+        response = send_email(payload['to'], payload['subject'], payload['body'])
+    except HttpError as error:
+        # Only rate-limit rejections are certain not to have sent anything;
+        # a 5xx may have delivered the message, so it is not resent
+        if is_rate_limited(error):
+            raise RetryableError(str(error)) from error
+        raise
+    return f"Email sent to {payload['to']} (id {response.get('id')})"
+
+
+def _add_event(payload: Dict) -> str:
+    from googleapiclient.errors import HttpError
+    from calendar_integration import build_event_body, find_conflicts, insert_event
+    from rate_limiter import RETRYABLE_STATUSES, is_rate_limited
+
+    start_time = datetime.fromisoformat(payload['start_time'])
+    end_time = datetime.fromisoformat(payload['end_time'])
+    body = build_event_body(
+        payload['summary'], start_time, end_time, payload.get('description'), payload.get('location')
+    )
+    # The ID chosen at enqueue time makes a retried insert idempotent
+    body['id'] = payload['event_id']
+    conflicts = ", ".join(
+        c['summary'] for c in find_conflicts(start_time, end_time) if c['id'] != body['id']
+    )
+    try:
+        event = insert_event(body)
+    except HttpError as error:
+        if error.resp.status == 409:
+            return f"Event {payload['summary']} already created"
+        if error.resp.status in RETRYABLE_STATUSES or is_rate_limited(error):
+            raise RetryableError(str(error)) from error
+        raise
+    result = f"Event created: {event.get('htmlLink')}"
+    if conflicts:
+        result += f" (overlaps with: {conflicts})"
+    return result
+
+
+def _delete_event(payload: Dict) -> str:
+    from googleapiclient.errors import HttpError
+    from calendar_integration import remove_event
+    from rate_limiter import RETRYABLE_STATUSES, is_rate_limited
+    try:
+        remove_event(payload['event_id'])
+    except HttpError as error:
+        if error.resp.status in (404, 410):
+            return "Event already deleted"
+        if error.resp.status in RETRYABLE_STATUSES or is_rate_limited(error):
+            raise RetryableError(str(error)) from error
+        raise
+    return "Event deleted successfully"
+
+
+# kind -> (runner, safe to re-run after an interruption mid-call)
+HANDLERS: Dict[str, Tuple[Callable[[Dict], str], bool]] = {
+    'send_email': (_send_email, False),
+    'add_event': (_add_event, True),
+    'delete_event': (_delete_event, True),
+}
+
+
+def _dedup_key(kind: str, payload: Dict) -> str:
+    canonical = json.dumps({'kind': kind, 'payload': payload}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _backoff(attempts: int) -> float:
+    return min(RETRY_CAP, RETRY_BASE * 2 ** (attempts - 1))
+
+
+class Outbox:
+    """
+    Write-ahead queue of side-effecting Google API calls.
+    
+    Jobs are committed to SQLite (WAL) before enqueue returns and a daemon
+    thread executes them in order, retrying transient failures with
+    backoff. An identical job enqueued while an earlier one is still
+    pending (within DEDUP_WINDOW) shares it.
+    """
+
+    def __init__(self, path: str = OUTBOX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._wake = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def enqueue(self, kind: str, payload: Dict) -> Dict:
+        """
+        Durably queue a job and wake the worker.
+        
+        Args:
+            kind: 'send_email', 'add_event' or 'delete_event'
+            payload: JSON-serializable arguments for the job
+        
+        Returns:
+            Dict: {'id': job ID, 'duplicate': True if an identical pending
+            job was found instead}
+        """
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind {kind}")
+        key = _dedup_key(kind, payload)
+        if kind == 'add_event':
+            # Fixed before the first attempt so retries cannot duplicate it;
+            # hex digits are valid in Calendar's base32hex event IDs
+            payload = {**payload, 'event_id': uuid.uuid4().hex}
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE dedup_key = ? AND status IN (?, ?) AND created_at > ? "
+                "ORDER BY id DESC LIMIT 1",
+                (key, QUEUED, RUNNING, now - DEDUP_WINDOW)
+            ).fetchone()
+            if row:
+                return {'id': row['id'], 'duplicate': True}
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, payload, dedup_key, status, next_attempt, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload), key, QUEUED, now, now, now)
+            )
+            job_id = cursor.lastrowid
+        self.start()
+        self._wake.set()
+        return {'id': job_id, 'duplicate': False}
+
+    def jobs(self, limit: int = 20) -> List[Dict]:
+        """Return the most recent jobs, newest first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, kind, payload, status, attempts, next_attempt, result, error, "
+                "created_at, updated_at FROM jobs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [{**dict(row), 'payload': json.loads(row['payload'])} for row in rows]
+
+    def depth(self) -> Dict[str, int]:
+        """Return job counts by status."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def _recover(self) -> None:
+        """Settle jobs a previous process left running."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            for row in conn.execute("SELECT id, kind FROM jobs WHERE status = ?", (RUNNING,)).fetchall():
+                if HANDLERS[row['kind']][1]:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, next_attempt = ?, updated_at = ? WHERE id = ?",
+                        (QUEUED, now, now, row['id'])
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                        (FAILED, "interrupted mid-send; not retried to avoid a duplicate",
+                         now, row['id'])
+                    )
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? AND next_attempt <= ? ORDER BY id LIMIT 1",
+                (QUEUED, now)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (RUNNING, now, row['id'])
+                )
+            return row
+
+    def _seconds_until_due(self) -> Optional[float]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT MIN(next_attempt) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def _finish(self, job_id: int, status: str, **fields) -> None:
+        now = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET status = ?, updated_at = ?{', ' if fields else ''}{assignments} "
+                f"WHERE id = ?",
+                (status, now, *fields.values(), job_id)
+            )
+
+    def run_one(self) -> bool:
+        """Execute the next due job; return False if none was due."""
+        row = self._claim()
+        if row is None:
+            return False
+        runner = HANDLERS[row['kind']][0]
+        attempts = row['attempts'] + 1
+        try:
+            result = runner(json.loads(row['payload']))
+        except RetryableError as e:
+            if attempts >= MAX_ATTEMPTS:
+                self._finish(row['id'], FAILED, error=str(e))
+            else:
+                self._finish(row['id'], QUEUED, error=str(e),
+                             next_attempt=time.time() + _backoff(attempts))
+            logging.warning("Outbox job %s attempt %d failed: %s", row['id'], attempts, str(e))
+        except Exception as e:
+            logging.error("Outbox job %s failed: %s", row['id'], str(e))
+            self._finish(row['id'], FAILED, error=str(e))
+        else:
+            self._finish(row['id'], DONE, result=result, error=None)
+        return True
+
+    @property
+    def started(self) -> bool:
+        """True once the background worker has been started."""
+        return self._worker is not None
+
+    def start(self) -> None:
+        """Start the background worker if it is not running yet."""
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, name='outbox-worker', daemon=True)
+        self._recover()
+        self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                while self.run_one():
+                    pass
+                delay = self._seconds_until_due()
+            except Exception as e:
+                logging.error("Outbox worker error: %s", str(e))
+                delay = RETRY_BASE
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def wait_idle(self, timeout: float = 30.0) -> bool:
+        """
+        Block until no job is running or due within timeout.
+        
+        Returns:
+            bool: False if the timeout expired first
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            counts = self.depth()
+            due = self._seconds_until_due()
+            if not counts.get(RUNNING) and (due is None or due > deadline - time.time()):
+                return True
+            time.sleep(0.05)
+        return False
+
+
+_outbox: Optional[Outbox] = None
+
+
+def get_outbox() -> Outbox:
+    """Return the process-wide outbox."""
+    global _outbox
+    if _outbox is None:
+        _outbox = Outbox()
+    return _outbox
+
+
+def queue_email(to: str, subject: str, body: str) -> Dict:
+    """Queue an email for sending; see Outbox.enqueue."""
+    return get_outbox().enqueue('send_email', {'to': to, 'subject': subject, 'body': body})
+
+
+def queue_add_event(
+    summary: str,
+    start_time: datetime,
+    end_time: Optional[datetime] = None,
+    description: Optional[str] = None,
+    location: Optional[str] = None
+) -> Dict:
+    """Queue a calendar event insert; see Outbox.enqueue."""
+    end_time = end_time or start_time + timedelta(hours=1)
+    return get_outbox().enqueue('add_event', {
+        'summary': summary,
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat(),
+        'description': description,
+        'location': location,
+    })
+
+
+def queue_delete_event(event_id: str) -> Dict:
+    """Queue a calendar event deletion; see Outbox.enqueue."""
+    return get_outbox().enqueue('delete_event', {'event_id': event_id})
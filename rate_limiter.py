@@ -0,0 +1,235 @@
+"""Shared pacing, retry and adaptive concurrency for Google API calls."""
+
+import logging
+import random
+import socket
+import ssl
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+T = TypeVar('T')
+
+# Per-user quotas: Gmail meters quota units, Calendar meters requests
+API_LIMITS: Dict[str, Dict[str, float]] = {
+    'gmail': {'requests_per_second': 50, 'units_per_second': 250},
+    'calendar': {'requests_per_second': 10, 'units_per_second': 10},
+}
+DEFAULT_LIMITS = {'requests_per_second': 10, 'units_per_second': 10}
+
+# Quota units per method (Gmail usage limits table); unlisted methods cost 1
+QUOTA_UNITS: Dict[str, int] = {
+    'gmail.users.getProfile': 1,
+    'gmail.users.messages.get': 5,
+    'gmail.users.messages.list': 5,
+    'gmail.users.messages.send': 100,
+    'gmail.users.history.list': 2,
+}
+
+# Transport failures on keep-alive connections (dropped or timed-out
+# sockets, TLS resets, DNS hiccups); retried for idempotent calls
+TRANSIENT_ERRORS = (
+    socket.timeout, ConnectionError, ssl.SSLError, httplib2.ServerNotFoundError
+)
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5   # Seconds
+BACKOFF_CAP = 32.0   # Seconds
+RETRYABLE_STATUSES = {500, 502, 503, 504}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'quotaExceeded'}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'DELETE', 'PUT'}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate per second."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens, sleeping until they are available.
+        
+        Requests larger than the capacity are allowed once the bucket is
+        full so they cannot wait forever.
+        
+        Returns:
+            float: Seconds spent waiting
+        """
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit with additive increase, multiplicative decrease.
+    
+    Every success raises the limit by 1/limit (about +1 per round of
+    requests); every rate-limit response halves it.
+    """
+
+    def __init__(self, initial: float = 4, minimum: float = 1, maximum: float = 32):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        """Block until a concurrency slot is free."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool = False) -> None:
+        """Free a slot and adapt the limit to the outcome."""
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+def _error_reason(error: HttpError) -> str:
+    try:
+        return error.error_details[0].get('reason', '') if error.error_details else ''
+    except (AttributeError, IndexError, TypeError):
+        return ''
+
+
+def is_rate_limited(error: HttpError) -> bool:
+    """Return True for 429s and 403s whose reason is a rate or quota limit."""
+    status = error.resp.status
+    return status == 429 or (status == 403 and _error_reason(error) in RATE_LIMIT_REASONS)
+
+
+def _retry_after(error: HttpError) -> Optional[float]:
+    try:
+        return float(error.resp.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """Routes API calls through per-API token buckets, AIMD limits and retries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._apis: Dict[str, Tuple[TokenBucket, TokenBucket, AIMDLimiter]] = {}
+        self.stats = {'calls': 0, 'retries': 0, 'throttled': 0, 'wait_seconds': 0.0}
+
+    def _limits_for(self, api: str) -> Tuple[TokenBucket, TokenBucket, AIMDLimiter]:
+        with self._lock:
+            if api not in self._apis:
+                limits = API_LIMITS.get(api, DEFAULT_LIMITS)
+                self._apis[api] = (
+                    TokenBucket(limits['requests_per_second']),
+                    TokenBucket(limits['units_per_second']),
+                    AIMDLimiter()
+                )
+            return self._apis[api]
+
+    def concurrency_limit(self, api: str) -> float:
+        """Return the current adaptive concurrency limit for an API."""
+        return self._limits_for(api)[2].limit
+
+    def run(
+        self,
+        api: str,
+        call: Callable[[], T],
+        units: float = 1,
+        requests: int = 1,
+        idempotent: bool = True
+    ) -> T:
+        """
+        Run call under the API's pacing, retrying transient failures.
+        
+        Rate-limit responses are always retried since the request was not
+        processed; 5xx responses and transport errors (TRANSIENT_ERRORS)
+        only when the call is idempotent.
+        
+        Args:
+            api: API name used to select limits, e.g. 'gmail'
+            call: Zero-argument function performing the HTTP call
+            units: Quota units the call consumes
+            requests: HTTP requests the call counts as (batch size)
+            idempotent: Whether repeating the call is harmless
+        
+        Returns:
+            The call's result
+        """
+        request_bucket, unit_bucket, limiter = self._limits_for(api)
+        attempt = 0
+        while True:
+            waited = request_bucket.acquire(requests) + unit_bucket.acquire(units)
+            limiter.acquire()
+            throttled = False
+            try:
+                with self._lock:
+                    self.stats['calls'] += 1
+                    self.stats['wait_seconds'] += waited
+                return call()
+            except HttpError as error:
+                throttled = is_rate_limited(error)
+                retryable = throttled or (
+                    idempotent and error.resp.status in RETRYABLE_STATUSES
+                )
+                if not retryable or attempt >= MAX_RETRIES:
+                    raise
+                status = error.resp.status
+                delay = _retry_after(error)
+            except TRANSIENT_ERRORS as error:
+                # The request may have been processed, like a 5xx
+                if not idempotent or attempt >= MAX_RETRIES:
+                    raise
+                status = type(error).__name__
+                delay = None
+            finally:
+                limiter.release(throttled)
+
+            if delay is None:
+                delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            with self._lock:
+                self.stats['retries'] += 1
+                self.stats['throttled'] += int(throttled)
+            logging.warning(
+                "%s call failed with %s, retrying in %.2fs", api, status, delay
+            )
+            time.sleep(delay)
+            attempt += 1
+
+
+_scheduler = RequestScheduler()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Return the process-wide request scheduler."""
+    return _scheduler
+
+
+def quota_units(method_id: str) -> int:
+    """Return the quota cost of an API method such as 'gmail.users.messages.get'."""
+    return QUOTA_UNITS.get(method_id, 1)
@@ -0,0 +1,146 @@
+"""Tests for the busy-time interval index and free-slot search."""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from calendar_index import IntervalIndex, find_free_slots, merge_intervals
+
+TZ = pytz.timezone('America/New_York')
+
+
+def at(day: int, hour: int = 0, minute: int = 0) -> datetime:
+    """Local time on a day of October 2026 (the 19th is a Monday)."""
+    return TZ.localize(datetime(2026, 10, day, hour, minute))
+
+
+def ts(day: int, hour: int = 0, minute: int = 0) -> float:
+    return at(day, hour, minute).timestamp()
+
+
+# Monday: A and B overlap, C touches B, E is nested inside D.
+# Tuesday: an all-day event stored from midnight to midnight.
+EVENTS = [
+    (ts(19, 9), ts(19, 10), 'A'),
+    (ts(19, 9, 30), ts(19, 11), 'B'),
+    (ts(19, 11), ts(19, 12), 'C'),
+    (ts(19, 13), ts(19, 17), 'D'),
+    (ts(19, 14), ts(19, 15), 'E'),
+    (ts(20), ts(21), 'all-day'),
+]
+INDEX = IntervalIndex(EVENTS)
+
+
+@pytest.mark.parametrize("intervals, expected", [
+    ([], []),
+    ([(1, 3), (2, 5)], [(1, 5)]),
+    ([(1, 3), (3, 5)], [(1, 5)]),
+    ([(1, 10), (2, 3), (4, 5)], [(1, 10)]),
+    ([(6, 8), (1, 2), (3, 4)], [(1, 2), (3, 4), (6, 8)]),
+    ([(5, 9), (1, 6), (8, 12)], [(1, 12)]),
+])
+def test_merge_intervals(intervals, expected):
+    assert merge_intervals(intervals) == expected
+
+
+@pytest.mark.parametrize("start, end, free", [
+    (ts(19, 8), ts(19, 9), True),
+    (ts(19, 8), ts(19, 9, 1), False),
+    (ts(19, 10), ts(19, 10, 30), False),
+    # Between C and D, touching both
+    (ts(19, 12), ts(19, 13), True),
+    (ts(19, 11, 59), ts(19, 12, 30), False),
+    (ts(19, 12, 30), ts(19, 13, 1), False),
+    # After the nested E has ended but still inside D
+    (ts(19, 15, 30), ts(19, 16), False),
+    (ts(19, 17), ts(19, 18), True),
+    (ts(20, 12), ts(20, 13), False),
+    (ts(19, 23), ts(20, 0, 1), False),
+    (ts(21), ts(21, 1), True),
+])
+def test_is_free(start, end, free):
+    assert INDEX.is_free(start, end) is free
+
+
+@pytest.mark.parametrize("start, end, labels", [
+    (ts(19, 9, 45), ts(19, 11, 30), ['A', 'B', 'C']),
+    (ts(19, 10), ts(19, 11), ['B']),
+    (ts(19, 12), ts(19, 13), []),
+    (ts(19, 14, 30), ts(19, 14, 45), ['D', 'E']),
+    (ts(19, 15, 30), ts(19, 16), ['D']),
+    (ts(19, 16), ts(20, 8), ['D', 'all-day']),
+])
+def test_overlapping(start, end, labels):
+    assert [item[2] for item in INDEX.overlapping(start, end)] == labels
+
+
+def test_busy_between_merges_and_clips():
+    assert INDEX.busy_between(ts(19, 9, 30), ts(19, 16)) == [
+        (ts(19, 9, 30), ts(19, 12)),
+        (ts(19, 13), ts(19, 16)),
+    ]
+
+
+def test_empty_index():
+    index = IntervalIndex([])
+    assert len(index) == 0
+    assert index.is_free(ts(19, 9), ts(19, 10))
+    assert index.overlapping(ts(19, 9), ts(19, 10)) == []
+
+
+def slots(busy, range_start, range_end, minutes=30, **kwargs):
+    return find_free_slots(
+        busy, range_start, range_end, timedelta(minutes=minutes), TZ, **kwargs
+    )
+
+
+def test_free_slots_around_indexed_events():
+    busy = INDEX.busy_between(ts(19), ts(21))
+    assert slots(busy, at(19), at(20, 23, 59)) == [(at(19, 12), at(19, 13))]
+
+
+@pytest.mark.parametrize("busy, minutes, expected", [
+    # Busy until exactly the start of the working day
+    ([(ts(19, 8), ts(19, 9))], 60, [(at(19, 9), at(19, 17))]),
+    # Straddling the start and the end of the working day
+    ([(ts(19, 8), ts(19, 9, 30)), (ts(19, 16, 30), ts(19, 18))], 60,
+     [(at(19, 9, 30), at(19, 16, 30))]),
+    # Gaps exactly as long as the slot at both edges
+    ([(ts(19, 9, 30), ts(19, 16, 30))], 30,
+     [(at(19, 9), at(19, 9, 30)), (at(19, 16, 30), at(19, 17))]),
+    ([(ts(19, 9, 30), ts(19, 16, 30))], 31, []),
+    # Adjacent busy spans leave no gap between them
+    (merge_intervals([(ts(19, 9), ts(19, 12)), (ts(19, 12), ts(19, 17))]), 1, []),
+])
+def test_free_slots_at_working_day_edges(busy, minutes, expected):
+    assert slots(busy, at(19), at(19, 23, 59), minutes) == expected
+
+
+def test_free_slots_clip_to_range():
+    assert slots([], at(19, 14, 20), at(19, 15)) == [(at(19, 14, 20), at(19, 15))]
+    assert slots([], at(19, 16, 45), at(19, 18)) == []
+
+
+def test_all_day_event_blocks_the_whole_day():
+    busy = [(ts(20), ts(21))]
+    assert slots(busy, at(19), at(21, 23, 59)) == [
+        (at(19, 9), at(19, 17)),
+        (at(21, 9), at(21, 17)),
+    ]
+
+
+def test_weekends():
+    # Saturday the 17th to Monday the 19th
+    assert slots([], at(17), at(19, 23, 59)) == [(at(19, 9), at(19, 17))]
+    assert slots([], at(17), at(18, 23, 59), weekdays_only=False) == [
+        (at(17, 9), at(17, 17)),
+        (at(18, 9), at(18, 17)),
+    ]
+
+
+def test_limit():
+    assert slots([], at(19), at(23, 23, 59), limit=2) == [
+        (at(19, 9), at(19, 17)),
+        (at(20, 9), at(20, 17)),
+    ]
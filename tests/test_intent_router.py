@@ -0,0 +1,121 @@
+"""Table-driven tests for the local intent router."""
+
+from datetime import datetime
+
+import pytest
+
+import intent_router
+from intent_router import resolve_range, route
+
+# Saturday morning
+NOW = datetime(2026, 10, 17, 9, 0)
+
+
+@pytest.mark.parametrize("text, name, slots", [
+    ("list emails", 'list_emails', {'max_results': 5}),
+    ("show my 10 latest emails", 'list_emails', {'max_results': 10}),
+    ("what's in my inbox?", 'list_emails', {'max_results': 5}),
+    ("emails from alice", 'search_emails', {'query': 'from:alice'}),
+    ("any emails from alice?", 'search_emails', {'query': 'from:alice'}),
+    ("emails about sales and marketing", 'search_emails', {'query': 'sales and marketing'}),
+    ("messages with subject quarterly report", 'search_emails',
+     {'query': 'subject:"quarterly report"'}),
+    ("am I free friday at 3pm for 30 minutes", 'is_free', {
+        'start': datetime(2026, 10, 23, 15, 0),
+        'end': datetime(2026, 10, 23, 15, 30),
+        'minutes': 30,
+    }),
+    ("am I free for 30 minutes friday at 3pm", 'is_free', {
+        'start': datetime(2026, 10, 23, 15, 0),
+        'end': datetime(2026, 10, 23, 15, 30),
+        'minutes': 30,
+    }),
+    ("am i busy tomorrow at noon", 'is_free', {
+        'start': datetime(2026, 10, 18, 12, 0),
+        'end': datetime(2026, 10, 18, 13, 0),
+        'minutes': 60,
+    }),
+    ("find a 30 minute slot next week", 'find_slot', {
+        'start': datetime(2026, 10, 19),
+        'end': datetime(2026, 10, 26),
+        'minutes': 30,
+    }),
+    ("what's on tomorrow", 'list_events', {
+        'start': datetime(2026, 10, 18),
+        'end': datetime(2026, 10, 19),
+        'when': 'tomorrow',
+    }),
+    ("schedule for may", 'list_events', {
+        'start': datetime(2027, 5, 1),
+        'end': datetime(2027, 6, 1),
+        'when': 'for may',
+    }),
+    ("list events", 'list_events', {
+        'start': NOW,
+        'end': datetime(2026, 10, 24),
+        'when': 'the next 7 days',
+    }),
+])
+def test_routes_locally(text, name, slots):
+    intent = route(text, NOW)
+    assert intent is not None
+    assert intent.name == name
+    assert intent.slots == slots
+    assert intent.confidence >= intent_router.CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("text", [
+    "messages from mom saying she is sick, what should I do?",
+    "emails about my flight, is it delayed?",
+    "mail from the bank about my loan, should I refinance?",
+    "emails from alice and draft a reply",
+    "show emails from bob then summarize them",
+    "list events and email them to carol",
+    "meetings 2",
+    "am I free friday",
+    "write a poem about autumn",
+    "what can you do?",
+])
+def test_falls_back_to_model(text):
+    assert route(text, NOW) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("", (datetime(2026, 10, 17), datetime(2026, 10, 18))),
+    ("today", (datetime(2026, 10, 17), datetime(2026, 10, 18))),
+    ("tomorrow", (datetime(2026, 10, 18), datetime(2026, 10, 19))),
+    # Saturday itself counts; "next" always moves on a week
+    ("saturday", (datetime(2026, 10, 17), datetime(2026, 10, 18))),
+    ("next saturday", (datetime(2026, 10, 24), datetime(2026, 10, 25))),
+    ("on monday", (datetime(2026, 10, 19), datetime(2026, 10, 20))),
+    ("this week", (datetime(2026, 10, 17), datetime(2026, 10, 19))),
+    ("next week", (datetime(2026, 10, 19), datetime(2026, 10, 26))),
+    ("the weekend", (datetime(2026, 10, 17), datetime(2026, 10, 19))),
+    ("in 3 days", (datetime(2026, 10, 20), datetime(2026, 10, 21))),
+    ("the next 10 days", (datetime(2026, 10, 17), datetime(2026, 10, 27))),
+    ("this month", (datetime(2026, 10, 17), datetime(2026, 11, 1))),
+    ("next month", (datetime(2026, 11, 1), datetime(2026, 12, 1))),
+    ("october", (datetime(2026, 10, 1), datetime(2026, 11, 1))),
+    ("in december", (datetime(2026, 12, 1), datetime(2027, 1, 1))),
+    ("may", (datetime(2027, 5, 1), datetime(2027, 6, 1))),
+    ("may 2026", (datetime(2026, 5, 1), datetime(2026, 6, 1))),
+    ("june 5", (datetime(2027, 6, 5), datetime(2027, 6, 6))),
+    ("november 2", (datetime(2026, 11, 2), datetime(2026, 11, 3))),
+    ("2024-06-05", (datetime(2024, 6, 5), datetime(2024, 6, 6))),
+])
+def test_resolve_range(text, expected):
+    assert resolve_range(text, NOW) == expected
+
+
+@pytest.mark.parametrize("text", ["2", "15", "someday", "whenever works"])
+def test_resolve_range_rejects_ambiguous(text):
+    assert resolve_range(text, NOW) is None
+
+
+def test_stats_count_fallbacks():
+    stats = intent_router.RouterStats()
+    stats.record(None)
+    stats.record(intent_router.Intent('list_emails', 0.95))
+    assert stats.routed == {'list_emails': 1}
+    assert stats.fallbacks == 1
+    assert stats.hit_rate == 0.5
@@ -0,0 +1,281 @@
+"""OpenAI tool definitions over the Gmail and Calendar integrations."""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+
+import async_api
+import metrics
+
+# Tool results are cut down to this many characters of JSON before going back to the model
+MAX_TOOL_RESULT_CHARS = 4000
+
+_DATE = {'type': 'string', 'description': 'Date as YYYY-MM-DD'}
+_TIME = {'type': 'string', 'description': 'Local time as HH:MM (24-hour)'}
+
+
+def _function(name: str, description: str, properties: Dict, required: List[str]) -> Dict:
+    return {
+        'type': 'function',
+        'function': {
+            'name': name,
+            'description': description,
+            'parameters': {
+                'type': 'object',
+                'properties': properties,
+                'required': required,
+            },
+        },
+    }
+
+
+TOOLS: List[Dict] = [
+    _function(
+        'list_emails',
+        "List the most recent inbox emails (sender, subject, date, snippet).",
+        {'max_results': {'type': 'integer', 'description': 'Number of emails, default 10'}},
+        []
+    ),
+    _function(
+        'search_emails',
+        "Search the mailbox with a Gmail query such as 'from:alice is:unread'. "
+        "Returns metadata only; use read_email for the full text.",
+        {
+            'query': {'type': 'string', 'description': 'Gmail search query'},
+            'max_results': {'type': 'integer', 'description': 'Number of emails, default 5'},
+        },
+        ['query']
+    ),
+    _function(
+        'read_email',
+        "Read the full text of one email by its id from list_emails or search_emails.",
+        {'id': {'type': 'string', 'description': 'Message id'}},
+        ['id']
+    ),
+    _function(
+        'send_email',
+        "Queue a plain-text email for sending; returns the outbox job id. "
+        "Only use when the user explicitly asked to send it.",
+        {
+            'to': {'type': 'string', 'description': 'Recipient email address'},
+            'subject': {'type': 'string'},
+            'body': {'type': 'string'},
+        },
+        ['to', 'subject', 'body']
+    ),
+    _function(
+        'list_upcoming_events',
+        "List upcoming calendar events.",
+        {
+            'days_ahead': {'type': 'integer', 'description': 'Days to look ahead, default 7'},
+            'max_results': {'type': 'integer', 'description': 'Number of events, default 10'},
+            'all_calendars': {
+                'type': 'boolean',
+                'description': 'Include shared and subscribed calendars, not just the primary one',
+            },
+        },
+        []
+    ),
+    _function(
+        'search_events',
+        "Search upcoming calendar events by text in title, description or location.",
+        {
+            'query': {'type': 'string'},
+            'max_results': {'type': 'integer', 'description': 'Number of events, default 10'},
+        },
+        ['query']
+    ),
+    _function(
+        'add_event',
+        "Queue a calendar event for creation; returns the outbox job id. "
+        "Only use when the user explicitly asked to schedule it.",
+        {
+            'summary': {'type': 'string', 'description': 'Event title'},
+            'date': _DATE,
+            'time': _TIME,
+            'duration_minutes': {'type': 'integer', 'description': 'Default 60'},
+            'location': {'type': 'string'},
+            'description': {'type': 'string'},
+        },
+        ['summary', 'date', 'time']
+    ),
+    _function(
+        'is_free',
+        "Check whether the user is free at a given time.",
+        {
+            'date': _DATE,
+            'time': _TIME,
+            'duration_minutes': {'type': 'integer', 'description': 'Default 60'},
+        },
+        ['date', 'time']
+    ),
+    _function(
+        'find_free_time',
+        "Find free slots within working hours between two dates (inclusive).",
+        {
+            'start_date': _DATE,
+            'end_date': _DATE,
+            'duration_minutes': {'type': 'integer', 'description': 'Default 60'},
+        },
+        ['start_date', 'end_date']
+    ),
+]
+
+
+async def _list_emails(max_results: int = 10) -> Any:
+    return await async_api.list_emails(max_results)
+
+
+async def _search_emails(query: str, max_results: int = 5) -> Any:
+    return await async_api.search_emails(query, max_results)
+
+
+async def _read_email(id: str) -> Any:
+    return {'id': id, 'body': await async_api.get_message_body(id)}
+
+
+def _queued(job: Dict) -> Dict:
+    return {'queued': True, 'job_id': job['id'], 'duplicate': job['duplicate']}
+
+
+async def _send_email(to: str, subject: str, body: str) -> Any:
+    import outbox
+    return _queued(await async_api.run_blocking(outbox.queue_email, to, subject, body))
+
+
+async def _list_upcoming_events(
+    days_ahead: int = 7,
+    max_results: int = 10,
+    all_calendars: bool = False
+) -> Any:
+    if all_calendars:
+        return await async_api.list_agenda(days_ahead, max_results)
+    return await async_api.list_upcoming_events(max_results, days_ahead)
+
+
+async def _search_events(query: str, max_results: int = 10) -> Any:
+    return await async_api.search_events(query, max_results)
+
+
+async def _add_event(
+    summary: str,
+    date: str,
+    time: str,
+    duration_minutes: int = 60,
+    location: str = None,
+    description: str = None
+) -> Any:
+    import outbox
+    from calendar_integration import parse_date_time
+    start = parse_date_time(date, time)
+    return _queued(await async_api.run_blocking(
+        outbox.queue_add_event,
+        summary,
+        start,
+        start + timedelta(minutes=duration_minutes),
+        description,
+        location
+    ))
+
+
+async def _is_free(date: str, time: str, duration_minutes: int = 60) -> Any:
+    from calendar_integration import parse_date_time
+    start = parse_date_time(date, time)
+    return {'free': await async_api.is_free(start, start + timedelta(minutes=duration_minutes))}
+
+
+async def _find_free_time(start_date: str, end_date: str, duration_minutes: int = 60) -> Any:
+    from calendar_integration import LOCAL_TIMEZONE, parse_date_time
+    range_start = max(parse_date_time(start_date, "00:00"), datetime.now(LOCAL_TIMEZONE))
+    slots = await async_api.find_free_time(
+        range_start, parse_date_time(end_date, "23:59"), duration_minutes
+    )
+    return [{'start': start, 'end': end} for start, end in slots]
+
+
+HANDLERS: Dict[str, Callable[..., Awaitable[Any]]] = {
+    'list_emails': _list_emails,
+    'search_emails': _search_emails,
+    'read_email': _read_email,
+    'send_email': _send_email,
+    'list_upcoming_events': _list_upcoming_events,
+    'search_events': _search_events,
+    'add_event': _add_event,
+    'is_free': _is_free,
+    'find_free_time': _find_free_time,
+}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=lambda item: item.isoformat()
+                      if isinstance(item, datetime) else str(item))
+
+
+def _serialize(result: Any) -> str:
+    """
+    Encode a tool result as JSON of at most MAX_TOOL_RESULT_CHARS.
+    
+    Oversized lists keep their leading items and oversized text its
+    beginning, wrapped with "truncated": true so the model still gets
+    valid JSON and knows something was left out.
+    """
+    text = _dumps(result)
+    if len(text) <= MAX_TOOL_RESULT_CHARS:
+        return text
+    if isinstance(result, list):
+        kept = len(result)
+        while kept > 0:
+            kept = min(kept - 1, kept * MAX_TOOL_RESULT_CHARS // len(text))
+            text = _dumps({'items': result[:kept], 'truncated': True, 'total': len(result)})
+            if len(text) <= MAX_TOOL_RESULT_CHARS:
+                return text
+        return text
+    preview = result if isinstance(result, str) else text
+    limit = MAX_TOOL_RESULT_CHARS
+    while True:
+        # Escaping can lengthen the text, so shrink until the JSON fits
+        text = _dumps({'text': preview[:limit], 'truncated': True})
+        if len(text) <= MAX_TOOL_RESULT_CHARS or limit == 0:
+            return text
+        limit = max(0, min(limit - 1, limit * MAX_TOOL_RESULT_CHARS // len(text)))
+
+
+async def run_tool(name: str, arguments: str) -> str:
+    """
+    Run one tool call and return its JSON-encoded result.
+    
+    Failures are returned to the model as {"error": ...} rather than
+    raised, so one bad call does not abort the others in the turn.
+    """
+    handler = HANDLERS.get(name)
+    if handler is None:
+        return json.dumps({'error': f"Unknown tool {name}"})
+    try:
+        kwargs = json.loads(arguments or "{}")
+        with metrics.span('tools.call', tool=name):
+            return _serialize(await handler(**kwargs))
+    except Exception as e:
+        logging.error("Tool %s failed: %s", name, str(e))
+        return json.dumps({'error': str(e)})
+
+
+async def dispatch_tool_calls(tool_calls: List[Dict]) -> List[Dict]:
+    """
+    Execute every tool call from one model turn concurrently.
+    
+    Args:
+        tool_calls: Assistant tool calls as {'id', 'function': {'name', 'arguments'}}
+    
+    Returns:
+        List[Dict]: 'tool' role messages in the same order as tool_calls
+    """
+    results = await asyncio.gather(*(
+        run_tool(call['function']['name'], call['function']['arguments'])
+        for call in tool_calls
+    ))
+    return [
+        {'role': 'tool', 'tool_call_id': call['id'], 'content': result}
+        for call, result in zip(tool_calls, results)
+    ]
@@ -0,0 +1,272 @@
+"""Map-reduce inbox triage with per-message summaries cached by message ID."""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import async_api
+import metrics
+
+# Define constants
+CACHE_FILE = "cache/triage.db"
+# Bumped whenever the instructions change so older summaries are redone
+TRIAGE_VERSION = 1
+# Size of one batch prompt in characters (roughly 4 per token)
+BATCH_CHAR_BUDGET = 8000
+MAX_BATCH_MESSAGES = 25
+# Characters of body or snippet included per message
+MAX_MESSAGE_CHARS = 1200
+# Batch prompts in flight at once
+MAX_CONCURRENT_BATCHES = 4
+
+PRIORITIES = ('high', 'medium', 'low')
+
+TRIAGE_INSTRUCTIONS = (
+    "You triage emails for a busy user. For every email in the input return "
+    "its id, a priority (high: needs the user soon or is from a person "
+    "waiting on them; medium: relevant but not urgent; low: newsletters, "
+    "notifications, promotions), a one-sentence summary and the concrete "
+    "action items it asks of the user (possibly none). Respond with JSON only: "
+    '{"messages": [{"id": "...", "priority": "high|medium|low", '
+    '"summary": "...", "action_items": ["..."]}]}'
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    message_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    priority TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    action_items TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class SummaryCache:
+    """SQLite store of per-message triage results keyed by Gmail message ID."""
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, msg_ids: List[str]) -> Dict[str, Dict]:
+        """Return current-version results for whichever msg_ids are cached."""
+        if not msg_ids:
+            return {}
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT message_id, priority, summary, action_items FROM summaries "
+                f"WHERE version = ? AND message_id IN ({','.join('?' * len(msg_ids))})",
+                (TRIAGE_VERSION, *msg_ids)
+            ).fetchall()
+        return {
+            row[0]: {
+                'priority': row[1],
+                'summary': row[2],
+                'action_items': json.loads(row[3]),
+            }
+            for row in rows
+        }
+
+    def store(self, results: Iterable[Dict]) -> None:
+        """Insert or replace results, each a dict with an 'id'."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (r['id'], TRIAGE_VERSION, r['priority'], r['summary'],
+                     json.dumps(r['action_items']), now)
+                    for r in results
+                ]
+            )
+
+
+_cache: Optional[SummaryCache] = None
+
+
+def get_summary_cache() -> SummaryCache:
+    """Return the process-wide triage summary cache."""
+    global _cache
+    if _cache is None:
+        _cache = SummaryCache()
+    return _cache
+
+
+def _render(email: Dict) -> str:
+    text = email.get('body') or email.get('snippet', '')
+    return json.dumps({
+        'id': email['id'],
+        'from': email['sender'],
+        'subject': email['subject'],
+        'date': email['date'],
+        'text': text[:MAX_MESSAGE_CHARS],
+    }, ensure_ascii=False)
+
+
+def pack_batches(emails: List[Dict]) -> List[List[Dict]]:
+    """
+    Group emails into batches that each fit one size-bounded prompt.
+    
+    Args:
+        emails: Messages to summarize
+    
+    Returns:
+        List[List[Dict]]: Batches in input order
+    """
+    batches: List[List[Dict]] = []
+    current: List[Dict] = []
+    size = 0
+    for email in emails:
+        rendered = len(_render(email))
+        if current and (size + rendered > BATCH_CHAR_BUDGET or len(current) >= MAX_BATCH_MESSAGES):
+            batches.append(current)
+            current, size = [], 0
+        current.append(email)
+        size += rendered
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_results(text: str, msg_ids: List[str]) -> List[Dict]:
+    """
+    Read the model's JSON answer, keeping only well-formed entries for msg_ids.
+    
+    Returns:
+        List[Dict]: id, priority, summary and action_items per message
+    """
+    match = re.search(r"\{.*\}", text, re.S)
+    try:
+        data = json.loads(match.group(0)) if match else {}
+    except ValueError:
+        return []
+    wanted = set(msg_ids)
+    results = []
+    for item in data.get('messages', []) if isinstance(data, dict) else []:
+        if not isinstance(item, dict) or item.get('id') not in wanted:
+            continue
+        priority = str(item.get('priority', 'medium')).lower()
+        action_items = item.get('action_items') or []
+        results.append({
+            'id': item['id'],
+            'priority': priority if priority in PRIORITIES else 'medium',
+            'summary': str(item.get('summary', '')).strip(),
+            'action_items': [str(a) for a in action_items] if isinstance(action_items, list) else [],
+        })
+        wanted.discard(item['id'])
+    return results
+
+
+async def summarize_batch(batch: List[Dict], semaphore: asyncio.Semaphore) -> List[Dict]:
+    """Map step: summarize one batch with a single model call."""
+    from agent import complete_async
+
+    async with semaphore:
+        prompt = "Emails (one JSON object per line):\n" + "\n".join(_render(e) for e in batch)
+        try:
+            with metrics.span('triage.batch'):
+                text = await complete_async(TRIAGE_INSTRUCTIONS, prompt)
+        except Exception as e:
+            logging.error("Triage batch of %d failed: %s", len(batch), str(e))
+            return []
+    results = parse_results(text, [e['id'] for e in batch])
+    if len(results) < len(batch):
+        logging.error("Triage batch answered %d of %d emails", len(results), len(batch))
+    return results
+
+
+def reduce_digest(emails: List[Dict], results: Dict[str, Dict]) -> Dict:
+    """
+    Reduce step: merge per-message results into a prioritized digest.
+    
+    Messages without a result (a failed batch) are listed as medium
+    priority with their snippet so nothing silently disappears.
+    
+    Returns:
+        Dict: 'high'/'medium'/'low' lists of messages (newest first) and
+        'action_items' as (action, message) pairs in priority order
+    """
+    digest: Dict = {priority: [] for priority in PRIORITIES}
+    for email in emails:
+        result = results.get(email['id']) or {
+            'priority': 'medium', 'summary': email.get('snippet', ''), 'action_items': []
+        }
+        digest[result['priority']].append({**email, **result})
+
+    digest['action_items'] = [
+        (action, item)
+        for priority in PRIORITIES
+        for item in digest[priority]
+        for action in item['action_items']
+    ]
+    return digest
+
+
+@metrics.timed('triage.triage_inbox')
+async def triage_inbox(max_results: int = 30, include_bodies: bool = False) -> Dict:
+    """
+    Triage the newest inbox messages into a prioritized digest.
+    
+    Only messages without a cached summary are sent to the model, packed
+    into size-bounded batches that run concurrently, so re-triaging a
+    mostly unchanged inbox costs only the new messages.
+    
+    Args:
+        max_results: Number of inbox messages to triage
+        include_bodies: Summarize full bodies instead of snippets for
+            uncached messages (one extra fetch each)
+    
+    Returns:
+        Dict: reduce_digest output plus 'cached' and 'summarized' counts
+    """
+    emails = await async_api.list_emails(max_results)
+    cache = get_summary_cache()
+    results = await async_api.run_blocking(cache.get_many, [e['id'] for e in emails])
+    pending = [e for e in emails if e['id'] not in results]
+
+    if include_bodies and pending:
+        bodies = await asyncio.gather(
+            *(async_api.get_message_body(e['id']) for e in pending),
+            return_exceptions=True
+        )
+        pending = [
+            {**e, 'body': body} if isinstance(body, str) else e
+            for e, body in zip(pending, bodies)
+        ]
+
+    summarized: List[Dict] = []
+    if pending:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+        for batch_results in await asyncio.gather(
+            *(summarize_batch(batch, semaphore) for batch in pack_batches(pending))
+        ):
+            summarized.extend(batch_results)
+        await async_api.run_blocking(cache.store, summarized)
+        results.update((r['id'], r) for r in summarized)
+
+    metrics.inc('triage.cached', len(emails) - len(pending))
+    metrics.inc('triage.summarized', len(summarized))
+    digest = reduce_digest(emails, results)
+    digest['cached'] = len(emails) - len(pending)
+    digest['summarized'] = len(summarized)
+    return digest